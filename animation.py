@@ -0,0 +1,108 @@
+"""Animated logos, decoded once and played on their own clock.
+
+An animated avatar is decoded a single time into resized RGBA frames with
+per-frame durations, the way samples/gif-viewer.py preprocesses a GIF.
+Identical consecutive frames are merged and long animations are capped.
+The result lives in the ImageCache, so every matchup that shows the team
+shares it. Static images become one-frame animations, which lets the
+drawing code treat every logo the same way.
+
+AnimationGovernor keeps logo playback within a share of one CPU. It
+stretches the time between animation ticks when a tick costs more than
+expected, e.g. on a Pi Zero, and its frame rate cap can be lowered while
+the board is idle.
+"""
+import bisect
+from itertools import islice
+
+from PIL import ImageSequence
+
+MAX_FRAMES = 120
+MIN_DURATION = 20  # ms; zero or tiny GIF delays would otherwise spin
+DEFAULT_DURATION = 100  # ms
+
+
+class LogoAnimation:
+    """Pre-decoded frames of one logo and when each of them is shown."""
+
+    def __init__(self, frames, durations):
+        self.frames = frames
+        self.durations = durations
+        self.ends = []  # cumulative end time of each frame, seconds
+        total = 0
+        for duration in durations:
+            total += duration / 1000
+            self.ends.append(total)
+        self.period = total
+
+    @property
+    def animated(self):
+        return len(self.frames) > 1
+
+    @property
+    def size_bytes(self):
+        return sum(frame.size[0] * frame.size[1] * 4 for frame in self.frames)
+
+    def _index(self, t):
+        if not self.animated:
+            return 0
+        return bisect.bisect_right(self.ends, t % self.period)
+
+    def frame_at(self, t):
+        """The frame showing t seconds into the animation."""
+        return self.frames[min(self._index(t), len(self.frames) - 1)]
+
+    def next_change(self, t):
+        """When, in seconds on the same clock, the frame after t starts."""
+        if not self.animated:
+            return float("inf")
+        cycle_start = t - t % self.period
+        return cycle_start + self.ends[min(self._index(t), len(self.ends) - 1)]
+
+
+def decode(source, size):
+    """Decode an opened PIL image into a LogoAnimation of RGBA frames."""
+    frames = []
+    durations = []
+    for source_frame in islice(ImageSequence.Iterator(source), MAX_FRAMES):
+        frame = source_frame.convert("RGBA").resize(size)
+        duration = max(MIN_DURATION, source_frame.info.get("duration") or DEFAULT_DURATION)
+        # Frames that don't change just extend the one before
+        if frames and frame.tobytes() == frames[-1].tobytes():
+            durations[-1] += duration
+            continue
+        frames.append(frame)
+        durations.append(duration)
+    return LogoAnimation(frames, durations)
+
+
+class AnimationGovernor:
+    """Spaces out animation ticks so they use at most cpu_share of a CPU."""
+
+    def __init__(self, max_fps=12, cpu_share=0.1):
+        self.min_interval = 1.0 / max_fps
+        self.cpu_share = cpu_share
+        self.interval = self.min_interval
+        self.cost = 0.0  # moving average CPU seconds per tick
+        self.ticks = 0
+
+    def next_tick(self, last_tick, wanted):
+        """The earliest time a tick wanted at `wanted` may run."""
+        return max(wanted, last_tick + self.interval)
+
+    def set_max_fps(self, max_fps):
+        """Change the frame rate cap, e.g. when the board goes idle."""
+        self.min_interval = 1.0 / max_fps
+        self.interval = max(self.min_interval, self.cost / self.cpu_share)
+
+    def record(self, cpu_seconds):
+        self.ticks += 1
+        self.cost = cpu_seconds if self.ticks == 1 else 0.9 * self.cost + 0.1 * cpu_seconds
+        self.interval = max(self.min_interval, self.cost / self.cpu_share)
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "fps_cap": round(1.0 / self.interval, 1),
+            "tick_ms": round(self.cost * 1000, 2),
+        }
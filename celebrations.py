@@ -0,0 +1,229 @@
+"""Short animations when a score changes in a way worth noticing.
+
+Each new snapshot is compared with the one before it. A team taking the
+lead from the other team or putting up a touchdown's worth of points in one
+refresh becomes an event; going ahead out of a tie, like the 0-0 every game
+starts at, is not a lead change. A background thread renders the event's
+animation frames (score roll-up, a flash of the score and, for a lead
+change, a pulse of the new leader's logo) as soon as it is detected, so
+playing them is nothing but swaps.
+
+Finished celebrations wait in a heap ordered by priority. The display loop
+pops one without waiting whenever it is free, and the celebration cuts into
+the rotation. When many matchups change in one refresh, only the most
+important few are kept, and anything that has waited too long is dropped.
+"""
+import heapq
+import itertools
+import math
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+# Event kinds, lower priority numbers play first
+LEAD_CHANGE = "lead_change"
+TOUCHDOWN = "touchdown"
+PRIORITIES = {LEAD_CHANGE: 0, TOUCHDOWN: 1}
+
+TOUCHDOWN_POINTS = 6.0
+FPS = 30
+ROLL_UP_SECONDS = 0.8
+FLASHES = 3
+FLASH_SECONDS = 0.15  # each of on and off
+PULSE_SECONDS = 0.6
+PULSE_SCALE = 1.3
+MAX_PENDING = 6
+MAX_AGE = 120  # seconds a rendered celebration stays worth showing
+
+Event = namedtuple("Event", "kind matchup_id side old_points new_points")
+
+_STOP = object()
+
+
+def _leader(matchup):
+    points1, points2 = matchup["team1"]["points"], matchup["team2"]["points"]
+    if points1 == points2:
+        return None
+    return matchup["team1"]["roster_id"] if points1 > points2 else matchup["team2"]["roster_id"]
+
+
+def detect_events(old_matchups, new_matchups):
+    """Events between two snapshots of the same week, matched on matchup_id."""
+    old_by_id = {matchup["matchup_id"]: matchup for matchup in old_matchups}
+    events = []
+    for matchup in new_matchups:
+        old = old_by_id.get(matchup["matchup_id"])
+        if old is None:
+            continue
+        old_points = {old[side]["roster_id"]: old[side]["points"] for side in ("team1", "team2")}
+        for side in ("team1", "team2"):
+            team = matchup[side]
+            before = old_points.get(team["roster_id"])
+            if before is not None and team["points"] - before >= TOUCHDOWN_POINTS:
+                events.append(Event(TOUCHDOWN, matchup["matchup_id"], side, before, team["points"]))
+
+        # Only a lead taken from the other team, not one out of a tie
+        leader, old_leader = _leader(matchup), _leader(old)
+        if leader is not None and old_leader is not None and leader != old_leader:
+            side = "team1" if matchup["team1"]["roster_id"] == leader else "team2"
+            before = old_points.get(leader, matchup[side]["points"])
+            events.append(Event(LEAD_CHANGE, matchup["matchup_id"], side, before, matchup[side]["points"]))
+    return events
+
+
+def roll_up(old_points, new_points, steps):
+    """Scores counting from old to new, easing out, ending on new."""
+    values = []
+    for step in range(1, steps + 1):
+        progress = 1 - (1 - step / steps) ** 3
+        values.append(round(old_points + (new_points - old_points) * progress, 2))
+    values[-1] = new_points
+    return values
+
+
+def flash_frames(frame, box, color, flashes=FLASHES, fps=FPS, seconds=FLASH_SECONDS):
+    """Flash a box of frame, lit pixels knocked out of a solid color."""
+    pixels = np.asarray(frame)
+    region = pixels[box.y:box.y + box.height, box.x:box.x + box.width]
+    lit = region.any(axis=2)
+    inverted = pixels.copy()
+    inverted[box.y:box.y + box.height, box.x:box.x + box.width] = np.where(lit[..., None], 0, color)
+    flashed = Image.fromarray(inverted)
+    steps = max(1, int(round(seconds * fps)))
+    return ([flashed] * steps + [frame] * steps) * flashes
+
+
+def pulse_frames(frame, tile, position, bg_color, fps=FPS, seconds=PULSE_SECONDS, scale=PULSE_SCALE):
+    """Grow a logo tile about its center and shrink it back."""
+    steps = max(2, int(round(seconds * fps)))
+    width, height = tile.size
+    center_x, center_y = position[0] + width / 2, position[1] + height / 2
+    frames = []
+    for step in range(1, steps + 1):
+        factor = 1 + (scale - 1) * math.sin(math.pi * step / steps)
+        size = (max(1, round(width * factor)), max(1, round(height * factor)))
+        scaled = tile.resize(size)
+        pulsed = frame.copy()
+        pulsed.paste(bg_color, position + (position[0] + width, position[1] + height))
+        corner = (round(center_x - size[0] / 2), round(center_y - size[1] / 2))
+        pulsed.paste(scaled, corner, scaled)
+        frames.append(pulsed)
+    return frames
+
+
+class Celebration:
+    """Pre-rendered frames for one matchup's events."""
+
+    def __init__(self, matchup_id, priority, frames, created):
+        self.matchup_id = matchup_id
+        self.priority = priority
+        self.frames = frames
+        self.created = created
+
+
+class CelebrationQueue:
+    """Renders celebrations in the background and hands them out by priority.
+
+    render(events, matchup) returns the frames for one matchup's events; it
+    runs on the queue's thread.
+    """
+
+    def __init__(self, render, max_pending=MAX_PENDING, max_age=MAX_AGE):
+        self.render = render
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self._requests = queue.Queue()
+        self._ready = []  # heap of (priority, sequence, Celebration)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._rendering = 0
+        self.detected = 0
+        self.rendered = 0
+        self.played = 0
+        self.dropped = 0
+        self.render_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name="celebrations", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        """Celebrations still being rendered."""
+        with self._lock:
+            return self._rendering
+
+    def submit(self, events, matchups):
+        """Queue the events from one snapshot to be rendered."""
+        by_matchup = {}
+        for event in events:
+            by_matchup.setdefault(event.matchup_id, []).append(event)
+        matchups_by_id = {matchup["matchup_id"]: matchup for matchup in matchups}
+        # Render the most important first, they are the ones that get kept
+        jobs = sorted(by_matchup.items(), key=lambda item: min(PRIORITIES[event.kind] for event in item[1]))
+        with self._lock:
+            self.detected += len(events)
+            self._rendering += len(jobs)
+        for matchup_id, matchup_events in jobs:
+            self._requests.put((matchup_events, matchups_by_id[matchup_id]))
+
+    def pop(self, now=None):
+        """The most important celebration that's ready, or None. Never waits."""
+        now = time.time() if now is None else now
+        with self._lock:
+            while self._ready:
+                _, _, celebration = heapq.heappop(self._ready)
+                if now - celebration.created <= self.max_age:
+                    self.played += 1
+                    return celebration
+                self.dropped += 1
+        return None
+
+    def close(self):
+        self._requests.put(_STOP)
+        self._thread.join(timeout=5)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "detected": self.detected,
+                "rendered": self.rendered,
+                "played": self.played,
+                "dropped": self.dropped,
+                "ready": len(self._ready),
+                "render_ms": round(self.render_seconds / self.rendered * 1000, 1) if self.rendered else 0.0,
+            }
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is _STOP:
+                return
+            events, matchup = request
+            start = time.perf_counter()
+            try:
+                frames = self.render(events, matchup)
+            except Exception as e:
+                print(f"Failed to render celebration for matchup {matchup['matchup_id']}: {e}")
+                frames = None
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._rendering -= 1
+                if not frames:
+                    continue
+                self.rendered += 1
+                self.render_seconds += elapsed
+                celebration = Celebration(
+                    matchup["matchup_id"], min(PRIORITIES[event.kind] for event in events), frames, time.time())
+                # A newer snapshot's celebration replaces an older one for the
+                # same matchup, its final frame would show old scores
+                self._ready = [entry for entry in self._ready if entry[2].matchup_id != celebration.matchup_id]
+                heapq.heapify(self._ready)
+                heapq.heappush(self._ready, (celebration.priority, next(self._sequence), celebration))
+                while len(self._ready) > self.max_pending:
+                    self._ready.remove(max(self._ready, key=lambda entry: entry[:2]))
+                    heapq.heapify(self._ready)
+                    self.dropped += 1
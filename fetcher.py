@@ -0,0 +1,169 @@
+"""Stale-while-revalidate wrapper around the Sleeper data fetch.
+
+The display loop always reads the last good snapshot straight away and never
+waits on the network. Refreshes run on a background thread:
+
+- only one refresh is in flight at a time, extra requests join it;
+- a circuit breaker stops calling Sleeper for a while after repeated
+  failures, then lets a single trial request through;
+- retries use jittered exponential backoff, and a retry budget caps them
+  at a fraction of normal traffic so an outage doesn't multiply our load.
+"""
+import random
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` failures in a row."""
+
+    def __init__(self, failure_threshold=3, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+
+    def allow(self, now=None):
+        now = time.monotonic() if now is None else now
+        if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+            # Let one trial request through
+            self.state = HALF_OPEN
+            return True
+        return self.state == CLOSED
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self, now=None):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic() if now is None else now
+
+
+class RetryBudget:
+    """Token bucket that allows retries for a fraction of requests.
+
+    Every request deposits `ratio` tokens and every retry spends one, so in
+    the long run retries stay under `ratio` of the request count.
+    """
+
+    def __init__(self, ratio=0.2, initial=3, max_tokens=10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = initial
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    """Full-jitter exponential backoff for the given retry attempt."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class SnapshotFetcher:
+    """Serves the last good result of `fetch` and refreshes it in the background."""
+
+    def __init__(self, fetch, max_retries=3, stale_after=180, hang_timeout=120,
+                 breaker=None, budget=None):
+        self.fetch = fetch
+        self.max_retries = max_retries
+        self.stale_after = stale_after
+        self.hang_timeout = hang_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.budget = budget or RetryBudget()
+
+        self.snapshot = None
+        self.snapshot_args = None
+        self.fetched_at = 0
+        self.last_error = None
+        self.updated = threading.Event()
+
+        self._lock = threading.Lock()
+        self._inflight = None  # (thread, started_at)
+        self.stats = {"requests": 0, "coalesced": 0, "retries": 0, "failures": 0, "rejected": 0}
+
+    def age(self, now=None):
+        if self.snapshot is None:
+            return None
+        return (time.time() if now is None else now) - self.fetched_at
+
+    def is_stale(self, now=None):
+        age = self.age(now)
+        return age is None or age > self.stale_after
+
+    def revalidate(self, *args):
+        """Start a background refresh unless one is already running."""
+        with self._lock:
+            if self._inflight is not None:
+                thread, started_at = self._inflight
+                # A request that hangs without a timeout shouldn't block every
+                # refresh after it; give up on it and start a new one
+                if thread.is_alive() and time.monotonic() - started_at < self.hang_timeout:
+                    self.stats["coalesced"] += 1
+                    return thread
+            thread = threading.Thread(target=self._refresh, args=args, name="snapshot-fetch", daemon=True)
+            self._inflight = (thread, time.monotonic())
+        thread.start()
+        return thread
+
+    def wait_for_first(self, *args):
+        """Block until there is a snapshot, retrying for as long as it takes."""
+        attempt = 0
+        while self.snapshot is None:
+            self.revalidate(*args).join(self.hang_timeout)
+            if self.snapshot is None:
+                delay = backoff_delay(attempt, cap=60)
+                print(f"No data yet ({self.last_error}), retrying in {delay:.0f}s")
+                time.sleep(delay)
+                attempt += 1
+        return self.snapshot
+
+    def _refresh(self, *args):
+        try:
+            attempt = 0
+            while True:
+                if not self.breaker.allow():
+                    self.stats["rejected"] += 1
+                    return
+                self.stats["requests"] += 1
+                self.budget.deposit()
+                try:
+                    result = self.fetch(*args)
+                except Exception as e:
+                    self.stats["failures"] += 1
+                    self.last_error = e
+                    self.breaker.record_failure()
+                    print(f"Fetch failed ({self.breaker.state}): {e}")
+                    if attempt >= self.max_retries or not self.budget.withdraw():
+                        return
+                    self.stats["retries"] += 1
+                    time.sleep(backoff_delay(attempt))
+                    attempt += 1
+                    continue
+
+                self.breaker.record_success()
+                self.last_error = None
+                self.snapshot = result
+                self.snapshot_args = args
+                self.fetched_at = time.time()
+                self.updated.set()
+                return
+        finally:
+            with self._lock:
+                if self._inflight is not None and self._inflight[0] is threading.current_thread():
+                    self._inflight = None
+
@@ -0,0 +1,269 @@
+"""Recording what the panel showed, and playing it back.
+
+FrameRecorder stores every swapped frame as a delta against the one before:
+for each changed row, the runs of changed pixels, with the time of the swap.
+Each record is zlib compressed, so a board can keep recording all the time.
+The file is a ring of two segments, <path> and <path>.1, and each segment
+starts with a full frame. When <path> reaches half the size budget it
+becomes <path>.1, and the older segment is dropped. A recorder started over
+an existing recording moves it to <path>.1 the same way, so a restart keeps
+the frames from before it.
+
+The replayer rebuilds the frames exactly and pushes them to any backend
+(panel, emulator or headless) at the original or an accelerated rate.
+Frames that came straight from draw_matchup are flagged, so two recordings
+can be compared as a golden-frame check (see golden.py):
+
+    python frame_recorder.py replay board.rec --emulator --speed 4
+    python frame_recorder.py compare golden.rec board.rec --diff-dir diffs
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+from PIL import Image
+
+MAGIC = b"FRAMES1\0"
+HEADER = struct.Struct("<8sHH")  # magic, width, height
+RECORD = struct.Struct("<dBI")  # swap time, flags, compressed payload length
+SPAN = struct.Struct("<HHH")  # row, first column, pixel count
+
+# Record flags
+KEYFRAME = 1  # a full frame, decoding restarts here
+MATCHUP = 2  # the frame draw_matchup composed, not a transition or logo tick
+
+MAX_GAP = 2  # unchanged pixels worth bridging rather than starting a new run
+FLUSH_INTERVAL = 1.0  # seconds
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def encode_delta(previous, current):
+    """Spans of current that differ from previous, as bytes.
+
+    previous is None for a keyframe, which encodes every row in full.
+    """
+    height, width = current.shape[:2]
+    if previous is None:
+        changed = np.ones((height, width), dtype=bool)
+    else:
+        changed = (previous != current).any(axis=2)
+
+    parts = []
+    for row in np.flatnonzero(changed.any(axis=1)):
+        columns = np.flatnonzero(changed[row])
+        # Split into runs wherever the gap is wider than a span header
+        breaks = np.flatnonzero(np.diff(columns) > MAX_GAP + 1)
+        starts = columns[np.r_[0, breaks + 1]]
+        ends = columns[np.r_[breaks, len(columns) - 1]] + 1
+        for start, end in zip(starts, ends):
+            parts.append(SPAN.pack(row, start, end - start))
+            parts.append(current[row, start:end].tobytes())
+    return b"".join(parts)
+
+
+def apply_delta(pixels, payload):
+    """Write the spans in payload over pixels, in place."""
+    offset = 0
+    while offset < len(payload):
+        row, start, count = SPAN.unpack_from(payload, offset)
+        offset += SPAN.size
+        pixels[row, start:start + count] = np.frombuffer(payload, np.uint8, count * 3, offset).reshape(count, 3)
+        offset += count * 3
+
+
+class FrameRecorder:
+    """Appends swapped frames to a size-bounded ring of two segment files."""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.segment_bytes = max_bytes // 2
+        self.frames = 0
+        self.bytes_written = 0
+        self._file = None
+        self._previous = None
+        self._last_flush = 0.0
+
+    def _open_segment(self, width, height):
+        if self._file is not None:
+            self._file.close()
+        # On first use too: after a crash or restart, path holds the frames
+        # leading up to it
+        if os.path.exists(self.path):
+            os.replace(self.path, self.path + ".1")
+        self._file = open(self.path, "wb")
+        self._file.write(HEADER.pack(MAGIC, width, height))
+        self._previous = None
+
+    def record(self, frame, flags=0, timestamp=None):
+        """Append an RGB PIL frame, swapped at timestamp (now by default)."""
+        timestamp = time.time() if timestamp is None else timestamp
+        current = np.asarray(frame.convert("RGB") if frame.mode != "RGB" else frame)
+        if self._file is None or self._file.tell() >= self.segment_bytes:
+            self._open_segment(frame.size[0], frame.size[1])
+        if self._previous is None:
+            flags |= KEYFRAME
+
+        payload = zlib.compress(encode_delta(self._previous, current), 1)
+        self._file.write(RECORD.pack(timestamp, flags, len(payload)))
+        self._file.write(payload)
+        self._previous = current
+        self.frames += 1
+        self.bytes_written += RECORD.size + len(payload)
+
+        # Flush now and then, a crash loses at most the last second
+        if timestamp - self._last_flush >= FLUSH_INTERVAL:
+            self._file.flush()
+            self._last_flush = timestamp
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "bytes": self.bytes_written,
+            "bytes_per_frame": round(self.bytes_written / self.frames) if self.frames else 0,
+        }
+
+
+def _read_segment(path):
+    with open(path, "rb") as segment:
+        header = segment.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+        magic, width, height = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a frame recording")
+        pixels = np.zeros((height, width, 3), dtype=np.uint8)
+        while True:
+            record = segment.read(RECORD.size)
+            if len(record) < RECORD.size:
+                return
+            timestamp, flags, length = RECORD.unpack(record)
+            payload = segment.read(length)
+            if len(payload) < length:
+                # The board stopped halfway through writing this one
+                return
+            if flags & KEYFRAME:
+                pixels[:] = 0
+            apply_delta(pixels, zlib.decompress(payload))
+            yield timestamp, flags, Image.fromarray(pixels.copy())
+
+
+def read_frames(path):
+    """Yield (timestamp, flags, PIL image) for every frame, oldest first."""
+    for segment in (path + ".1", path):
+        if os.path.exists(segment):
+            yield from _read_segment(segment)
+
+
+def replay(frames, matrix, canvas, speed=1.0):
+    """Push recorded frames to a matrix, speed times faster than recorded.
+
+    A speed of 0 or less plays the frames back to back. Returns the new
+    back buffer.
+    """
+    start = first_timestamp = None
+    for timestamp, flags, frame in frames:
+        if start is None:
+            start, first_timestamp = time.perf_counter(), timestamp
+        if speed > 0:
+            delay = (timestamp - first_timestamp) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        canvas.SetImage(frame)
+        canvas = matrix.SwapOnVSync(canvas)
+    return canvas
+
+
+def compare(golden_frames, candidate_frames, diff_dir=None):
+    """Compare the draw_matchup frames of two recordings.
+
+    Returns a list of (index, differing pixel count) for frames that don't
+    match; a missing frame on either side counts as every pixel. With
+    diff_dir, writes golden, candidate and difference images side by side
+    for each mismatch.
+    """
+    golden = [frame for _, flags, frame in golden_frames if flags & MATCHUP]
+    candidate = [frame for _, flags, frame in candidate_frames if flags & MATCHUP]
+    mismatches = []
+    for index in range(max(len(golden), len(candidate))):
+        if index >= len(golden) or index >= len(candidate):
+            frame = golden[index] if index < len(golden) else candidate[index]
+            mismatches.append((index, frame.size[0] * frame.size[1]))
+            continue
+        expected = np.asarray(golden[index])
+        actual = np.asarray(candidate[index])
+        if expected.shape != actual.shape:
+            mismatches.append((index, expected.shape[0] * expected.shape[1]))
+            continue
+        changed = (expected != actual).any(axis=2)
+        if changed.any():
+            mismatches.append((index, int(changed.sum())))
+            if diff_dir is not None:
+                os.makedirs(diff_dir, exist_ok=True)
+                width, height = golden[index].size
+                sheet = Image.new("RGB", (width * 3, height))
+                sheet.paste(golden[index], (0, 0))
+                sheet.paste(candidate[index], (width, 0))
+                sheet.paste(Image.fromarray((changed * 255).astype(np.uint8)).convert("RGB"), (width * 2, 0))
+                sheet.resize((width * 3 * 4, height * 4), Image.NEAREST).save(
+                    os.path.join(diff_dir, f"frame{index:04d}.png"))
+    return mismatches
+
+
+def _create_matrix(args):
+    if args.headless:
+        from headless import HeadlessMatrix, HeadlessOptions
+        options = HeadlessOptions()
+        return HeadlessMatrix(options)
+    if args.emulator:
+        from RGBMatrixEmulator import RGBMatrix, RGBMatrixOptions
+    else:
+        from rgbmatrix import RGBMatrix, RGBMatrixOptions
+    options = RGBMatrixOptions()
+    options.rows = 32
+    options.cols = 64
+    options.brightness = 40
+    if not args.emulator:
+        options.hardware_mapping = 'adafruit-hat'
+        options.gpio_slowdown = 4
+    return RGBMatrix(options=options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay or compare frame recordings.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay_parser = commands.add_parser("replay", help="Play a recording on a panel, the emulator or headless.")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument('--speed', type=float, default=1.0, help="Play this many times faster, 0 for no waits.")
+    replay_parser.add_argument('--emulator', action='store_true')
+    replay_parser.add_argument('--headless', action='store_true')
+
+    compare_parser = commands.add_parser("compare", help="Check a recording's matchup frames against a golden one.")
+    compare_parser.add_argument("golden")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument('--diff-dir', default=None, help="Write an image of each mismatch here.")
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        matrix = _create_matrix(args)
+        replay(read_frames(args.path), matrix, matrix.CreateFrameCanvas(), args.speed)
+        return 0
+
+    mismatches = compare(read_frames(args.golden), read_frames(args.candidate), args.diff_dir)
+    for index, pixels in mismatches:
+        print(f"matchup frame {index}: {pixels} pixels differ")
+    print("ok" if not mismatches else f"{len(mismatches)} frames differ")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Golden-frame check for draw_matchup.
+
+Runs a headless board against mock_sleeper.py with the game clock stopped
+and only static avatars, so every matchup frame is the same from run to
+run. The board records what it shows (main.py --record) and its matchup
+frames are compared with golden.rec, which is committed with the code:
+
+    python golden.py              # check the board still draws the same
+    python golden.py --update     # re-record golden.rec after a change
+                                  # that is meant to change how boards look
+
+Mismatched frames are written to --diff-dir as golden, candidate and
+difference images side by side. Exits non-zero on any difference.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import frame_recorder
+from mock_sleeper import MockSleeper
+from soak import Board
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check draw_matchup output against a golden recording.")
+    parser.add_argument('--golden', default=os.path.join(ROOT, "golden.rec"))
+    parser.add_argument('--update', action='store_true', help="Record a new golden recording instead of checking.")
+    parser.add_argument('--rotations', type=int, default=12)
+    parser.add_argument('--teams', type=int, default=12)
+    parser.add_argument('--clock-hours', type=float, default=1.7, help="Game hour the mock's scores are frozen at.")
+    parser.add_argument('--speed', type=float, default=60)
+    parser.add_argument('--timeout', type=float, default=120, help="Seconds to wait for the board to finish.")
+    parser.add_argument('--diff-dir', default="golden-diffs")
+    args = parser.parse_args()
+
+    mock = MockSleeper(teams=args.teams, clock_hours=args.clock_hours, gif_share=0).start()
+    work_dir = tempfile.mkdtemp(prefix="golden-")
+    recording = os.path.join(work_dir, "board.rec")
+    board = Board(
+        "board", mock.league_ids[0], mock.url, args.speed, "slide", "active", work_dir,
+        extra_args=["--week", str(mock.week), "--record", recording, "--rotations", str(args.rotations)],
+    )
+    keep = False
+    try:
+        try:
+            board.process.wait(args.timeout)
+        except subprocess.TimeoutExpired:
+            print(f"Board didn't finish {args.rotations} rotations in {args.timeout}s, see {board.log.name}")
+            keep = True
+            return 1
+        if board.process.returncode != 0:
+            print(f"Board exited with {board.process.returncode}, see {board.log.name}")
+            keep = True
+            return 1
+
+        if args.update:
+            for suffix in ("", ".1"):
+                if os.path.exists(args.golden + suffix):
+                    os.remove(args.golden + suffix)
+            # Only the matchup frames are compared, keep the committed file small
+            golden = frame_recorder.FrameRecorder(args.golden)
+            for timestamp, flags, frame in frame_recorder.read_frames(recording):
+                if flags & frame_recorder.MATCHUP:
+                    golden.record(frame, frame_recorder.MATCHUP, timestamp)
+            golden.close()
+            print(f"Wrote {golden.frames} matchup frames to {args.golden}")
+            return 0
+
+        mismatches = frame_recorder.compare(
+            frame_recorder.read_frames(args.golden), frame_recorder.read_frames(recording), args.diff_dir)
+        for index, pixels in mismatches:
+            print(f"matchup frame {index}: {pixels} pixels differ")
+        if mismatches:
+            print(f"{len(mismatches)} frames differ, see {args.diff_dir}")
+            return 1
+        print("ok")
+        return 0
+    finally:
+        board.stop()
+        mock.stop()
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""A matrix backend with no display, for soak runs and machines without a panel.
+
+Implements the parts of RGBMatrix and FrameCanvas the board uses. Frames
+set with SetImage() are kept, so the swapped-in frame can be inspected.
+"""
+from PIL import Image
+
+
+class HeadlessCanvas:
+    def __init__(self, width, height, brightness=100):
+        self.width = width
+        self.height = height
+        self.brightness = brightness
+        self.image = Image.new("RGB", (width, height))
+
+    def Clear(self):
+        self.image.paste((0, 0, 0), (0, 0, self.width, self.height))
+
+    def Fill(self, red, green, blue):
+        self.image.paste((red, green, blue), (0, 0, self.width, self.height))
+
+    def SetPixel(self, x, y, red, green, blue):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.image.putpixel((x, y), (red, green, blue))
+
+    def SetImage(self, image, offset_x=0, offset_y=0, unsafe=True):
+        if image.mode == "RGBA":
+            self.image.paste(image, (offset_x, offset_y), image)
+        else:
+            self.image.paste(image.convert("RGB"), (offset_x, offset_y))
+
+
+class HeadlessMatrix:
+    def __init__(self, options):
+        self.width = options.cols
+        self.height = options.rows
+        self.brightness = options.brightness
+        self.swaps = 0
+        self._front = HeadlessCanvas(self.width, self.height, self.brightness)
+
+    def CreateFrameCanvas(self):
+        return HeadlessCanvas(self.width, self.height, self.brightness)
+
+    def SwapOnVSync(self, canvas, framerate_fraction=1):
+        self.swaps += 1
+        self._front, canvas = canvas, self._front
+        return canvas
+
+    @property
+    def front(self):
+        """The canvas currently 'on the panel'."""
+        return self._front
+
+
+class HeadlessOptions:
+    """Stand-in for RGBMatrixOptions."""
+
+    def __init__(self):
+        self.rows = 32
+        self.cols = 64
+        self.brightness = 100
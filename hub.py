@@ -0,0 +1,415 @@
+"""Hub mode: one board fetches from Sleeper and the rest subscribe to it.
+
+A board run with --serve-hub publishes every snapshot it fetches to boards
+on the local network (--hub host:port), so the league and avatars are
+downloaded once per venue, not once per board.
+
+Each subscriber gets a TCP connection of length-prefixed messages, a JSON
+header plus an optional binary payload:
+
+- logo: one pre-resized logo tile, every frame as zlib-compressed RGBA.
+  Tiles are keyed by a hash of the file, so teams sharing an avatar share a
+  tile, and each tile is sent once per connection;
+- snapshot: every matchup in full, sent on connect and when the week changes;
+- delta: only the fields that changed since the last version this
+  subscriber was sent, usually a handful of scores;
+- ping: keeps idle connections open and lets boards notice a dead hub.
+
+Snapshots also carry the hub's NFL state, so subscribers follow its week
+and game windows without asking Sleeper. Every message from the hub, pings
+included, renews that state on the subscriber, so it never expires into a
+fetch of its own.
+
+HubClient looks like a SnapshotFetcher to the display loop: it keeps the
+last snapshot, sets `updated` when a new one lands, and goes stale when the
+hub stops sending. Messages say how old the hub's data was when they left
+it, and the board counts on from there on its own clock, so boards whose
+clocks disagree with the hub's (a Pi has no RTC) still go stale on time.
+"""
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+import zlib
+
+from PIL import Image
+
+from animation import LogoAnimation
+from fetcher import CircuitBreaker, backoff_delay
+
+FRAME = struct.Struct(">II")  # header length, payload length
+PING_INTERVAL = 15  # seconds
+READ_TIMEOUT = 3 * PING_INTERVAL
+WRITE_TIMEOUT = 10  # seconds before a stuck subscriber is dropped
+MAX_MESSAGE = 16 * 1024 * 1024
+
+
+def send_message(sock, header, payload=b""):
+    body = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    sock.sendall(FRAME.pack(len(body), len(payload)) + body + payload)
+    return FRAME.size + len(body) + len(payload)
+
+
+def _read_exactly(stream, size):
+    data = stream.read(size)
+    if len(data) < size:
+        raise ConnectionError("hub closed the connection")
+    return data
+
+
+def read_message(stream):
+    """Read one (header, payload) from a buffered socket file."""
+    header_size, payload_size = FRAME.unpack(_read_exactly(stream, FRAME.size))
+    if header_size + payload_size > MAX_MESSAGE:
+        raise ValueError(f"message of {header_size + payload_size} bytes is too big")
+    header = json.loads(_read_exactly(stream, header_size))
+    return header, _read_exactly(stream, payload_size), FRAME.size + header_size + payload_size
+
+
+def diff(old, new):
+    """The keys of new that differ from old, nested dicts diffed in turn.
+
+    Matchups never lose keys, so removals aren't represented.
+    """
+    changes = {}
+    for key, value in new.items():
+        before = old.get(key)
+        if isinstance(value, dict) and isinstance(before, dict):
+            nested = diff(before, value)
+            if nested:
+                changes[key] = nested
+        elif key not in old or value != before:
+            changes[key] = value
+    return changes
+
+
+def patch(old, changes):
+    """Apply a diff, returning new dicts and leaving old untouched."""
+    new = dict(old)
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(old.get(key), dict):
+            new[key] = patch(old[key], value)
+        else:
+            new[key] = value
+    return new
+
+
+def encode_logo(logo):
+    """(header fields, payload) for a LogoAnimation."""
+    payload = zlib.compress(b"".join(frame.tobytes() for frame in logo.frames), 6)
+    return {"size": list(logo.frames[0].size), "durations": logo.durations}, payload
+
+
+def decode_logo(header, payload):
+    width, height = header["size"]
+    frame_bytes = width * height * 4
+    pixels = zlib.decompress(payload)
+    frames = [
+        Image.frombytes("RGBA", (width, height), pixels[index * frame_bytes:(index + 1) * frame_bytes])
+        for index in range(len(header["durations"]))
+    ]
+    return LogoAnimation(frames, header["durations"])
+
+
+class _State:
+    """One published version, never modified after it is built."""
+
+    __slots__ = ("version", "week", "updated", "matchups", "order", "logos", "nfl_state")
+
+    def __init__(self, version, week, updated, matchups, order, logos, nfl_state):
+        self.version = version
+        self.week = week
+        self.updated = updated
+        self.matchups = matchups  # str(matchup_id) -> matchup, logos as keys
+        self.order = order
+        self.logos = logos  # key -> (header fields, payload)
+        self.nfl_state = nfl_state
+
+
+class HubServer:
+    """Publishes snapshots to subscribed boards, one thread per board.
+
+    load_logo(path) returns the LogoAnimation to send for a logo file, at
+    the size the boards draw it.
+    """
+
+    def __init__(self, load_logo, host="0.0.0.0", port=7777):
+        self.load_logo = load_logo
+        self._state = None
+        self._changed = threading.Condition()
+        self._stopping = False
+        self._logo_keys = {}  # (path, mtime_ns, size) -> key
+        self._version = 0
+        self._lock = threading.Lock()
+        self.stats = {"subscribers": 0, "connects": 0, "messages": 0, "bytes": 0, "logos_sent": 0}
+
+        hub = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                hub._serve(self.request)
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler, bind_and_activate=False)
+        self.server.daemon_threads = True
+        self.server.allow_reuse_address = True
+        self.server.server_bind()
+        self.server.server_activate()
+        self._thread = threading.Thread(target=self.server.serve_forever, name="hub-server", daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _logo_key(self, path):
+        stat = os.stat(path)
+        file_key = (path, stat.st_mtime_ns, stat.st_size)
+        key = self._logo_keys.get(file_key)
+        if key is None:
+            with open(path, "rb") as logo_file:
+                key = hashlib.blake2b(logo_file.read(), digest_size=8).hexdigest()
+            # Forget older versions of the same file
+            self._logo_keys = {k: v for k, v in self._logo_keys.items() if k[0] != path}
+            self._logo_keys[file_key] = key
+        return key
+
+    def publish(self, matchups, week, nfl_state=None):
+        """Make a snapshot from get_team_data() the latest version."""
+        previous = self._state
+        old_logos = previous.logos if previous is not None else {}
+        logos = {}
+        normalized = {}
+        for matchup in matchups:
+            teams = {}
+            for side in ("team1", "team2"):
+                team = dict(matchup[side])
+                if team.get("logo"):
+                    try:
+                        key = self._logo_key(team["logo"])
+                        if key not in logos:
+                            logos[key] = old_logos.get(key) or encode_logo(self.load_logo(team["logo"]))
+                        team["logo"] = key
+                    except Exception as e:
+                        print(f"Failed to prepare logo {team['logo']} for the hub: {e}")
+                        team["logo"] = None
+                teams[side] = team
+            normalized[str(matchup["matchup_id"])] = {**matchup, **teams}
+
+        self._version += 1
+        state = _State(self._version, week, time.time(), normalized, list(normalized),
+                       logos, nfl_state)
+        with self._changed:
+            self._state = state
+            self._changed.notify_all()
+
+    def _send(self, sock, header, payload=b""):
+        size = send_message(sock, header, payload)
+        with self._lock:
+            self.stats["messages"] += 1
+            self.stats["bytes"] += size
+
+    def _serve(self, sock):
+        sock.settimeout(WRITE_TIMEOUT)
+        with self._lock:
+            self.stats["subscribers"] += 1
+            self.stats["connects"] += 1
+        sent = None
+        sent_logos = set()
+        try:
+            while True:
+                with self._changed:
+                    self._changed.wait_for(
+                        lambda: self._stopping or (self._state is not None and self._state is not sent),
+                        timeout=PING_INTERVAL)
+                    if self._stopping:
+                        return
+                    state = self._state
+                if state is None or state is sent:
+                    self._send(sock, {"type": "ping"})
+                    continue
+
+                # Tiles first, so a board never draws a snapshot without them
+                for key, (fields, payload) in state.logos.items():
+                    if key not in sent_logos:
+                        self._send(sock, {"type": "logo", "key": key, **fields}, payload)
+                        with self._lock:
+                            self.stats["logos_sent"] += 1
+                sent_logos = set(state.logos)
+
+                header = {"version": state.version, "week": state.week, "updated": state.updated,
+                          "sent": time.time()}
+                if sent is None or sent.week != state.week:
+                    header.update(type="snapshot", matchups=[state.matchups[key] for key in state.order],
+                                  nfl_state=state.nfl_state)
+                else:
+                    header.update(
+                        type="delta",
+                        matchups={
+                            key: changes for key, changes in
+                            ((key, diff(sent.matchups.get(key, {}), matchup)) for key, matchup in state.matchups.items())
+                            if changes
+                        },
+                        removed=[key for key in sent.matchups if key not in state.matchups],
+                    )
+                    if state.order != sent.order:
+                        header["order"] = state.order
+                    if state.nfl_state != sent.nfl_state:
+                        header["nfl_state"] = state.nfl_state
+                self._send(sock, header)
+                sent = state
+        except OSError:
+            # The board went away or stopped reading, it will reconnect
+            return
+        finally:
+            with self._lock:
+                self.stats["subscribers"] -= 1
+
+
+def parse_address(address, default_port=7777):
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, default_port
+    return host, int(port)
+
+
+class HubClient:
+    """Subscribes to a hub and serves its snapshots like a SnapshotFetcher."""
+
+    def __init__(self, address, stale_after=180, schedule=None):
+        self.address = address
+        self.stale_after = stale_after
+        self.schedule = schedule
+        self.breaker = CircuitBreaker()  # closed while connected
+
+        self.snapshot = None
+        self.snapshot_args = None
+        self.fetched_at = 0
+        self.last_error = None
+        self.updated = threading.Event()
+
+        self._matchups = {}
+        self._order = []
+        self._logos = {}
+        self._nfl_state = None
+        self._sock = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="hub-client", daemon=True)
+        self.stats = {"connects": 0, "failures": 0, "messages": 0, "bytes": 0, "logos": 0}
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def age(self, now=None):
+        if self.snapshot is None:
+            return None
+        return (time.time() if now is None else now) - self.fetched_at
+
+    def is_stale(self, now=None):
+        age = self.age(now)
+        return age is None or age > self.stale_after
+
+    def revalidate(self, *args):
+        """Nothing to do, the hub pushes every refresh."""
+        return None
+
+    def wait_for_first(self, *args):
+        """Block until the hub has sent a snapshot."""
+        while self.snapshot is None:
+            if self.updated.wait(30) or self.snapshot is not None:
+                break
+            print(f"No data from the hub at {self.address[0]}:{self.address[1]} yet ({self.last_error})")
+        return self.snapshot
+
+    def logo(self, key):
+        """The LogoAnimation the hub sent for key, None if it sent none."""
+        return self._logos.get(key)
+
+    def _run(self):
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                with socket.create_connection(self.address, timeout=WRITE_TIMEOUT) as sock:
+                    sock.settimeout(READ_TIMEOUT)
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    self._sock = sock
+                    self.stats["connects"] += 1
+                    with sock.makefile("rb") as stream:
+                        while not self._stop.is_set():
+                            header, payload, size = read_message(stream)
+                            self.stats["messages"] += 1
+                            self.stats["bytes"] += size
+                            self.breaker.record_success()
+                            attempt = 0
+                            self._handle(header, payload)
+            except (OSError, ValueError) as e:
+                self._sock = None
+                if self._stop.is_set():
+                    return
+                self.last_error = e
+                self.stats["failures"] += 1
+                self.breaker.record_failure()
+                delay = backoff_delay(attempt, base=0.5, cap=10)
+                print(f"Lost the hub ({e}), reconnecting in {delay:.1f}s")
+                self._stop.wait(delay)
+                attempt += 1
+
+    def _handle(self, header, payload):
+        if header.get("nfl_state") is not None:
+            self._nfl_state = header["nfl_state"]
+        if self._nfl_state is not None and self.schedule is not None:
+            self.schedule.set_state(self._nfl_state)
+
+        kind = header["type"]
+        if kind == "logo":
+            self._logos[header["key"]] = decode_logo(header, payload)
+            self.stats["logos"] = len(self._logos)
+            return
+        if kind == "snapshot":
+            self._matchups = {str(matchup["matchup_id"]): matchup for matchup in header["matchups"]}
+            self._order = list(self._matchups)
+        elif kind == "delta":
+            matchups = dict(self._matchups)
+            for key in header["removed"]:
+                matchups.pop(key, None)
+            for key, changes in header["matchups"].items():
+                matchups[key] = patch(matchups.get(key, {}), changes)
+            self._matchups = matchups
+            self._order = header.get("order", self._order)
+        else:
+            return
+
+        # Keep only the tiles the current snapshot uses, as the hub does
+        used = {matchup[side].get("logo") for matchup in self._matchups.values() for side in ("team1", "team2")}
+        self._logos = {key: logo for key, logo in self._logos.items() if key in used}
+        self.stats["logos"] = len(self._logos)
+
+        self.snapshot = [self._matchups[key] for key in self._order]
+        self.snapshot_args = (header["week"],)
+        # Both times are on the hub's clock, only their difference means
+        # anything here
+        self.fetched_at = time.time() - max(0.0, header["sent"] - header["updated"])
+        self.updated.set()
@@ -0,0 +1,118 @@
+"""Bounded cache for the logo images drawn on the panel.
+
+Every image the board draws goes through one ImageCache. Files are opened,
+decoded and closed straight away, so no file handles are left behind for the
+garbage collector. The decoded, resized copies are kept in LRU order under a
+fixed byte budget. An entry is keyed on the file's mtime and size, so a logo
+that get_team_data() rewrites is reloaded and its old copy dropped.
+Animated logos are cached the same way, as one entry holding every frame.
+A lock makes it safe to share with the thread that pre-renders celebrations.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+import animation
+
+DEFAULT_BUDGET = 4 * 1024 * 1024  # bytes of decoded pixels
+
+
+def image_bytes(image):
+    """Approximate memory held by an image's pixels."""
+    if isinstance(image, animation.LogoAnimation):
+        return image.size_bytes
+    width, height = image.size
+    return width * height * len(image.getbands())
+
+
+class ImageCache:
+    """LRU cache of decoded images with a memory budget."""
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> image
+        self._keys_by_path = {}  # path -> keys cached for that file
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, path, size, mode="RGB"):
+        """Return the image at path resized to size, loading it if needed."""
+        return self._get(path, size, mode)
+
+    def get_animation(self, path, size):
+        """Return every frame of the image at path as a LogoAnimation."""
+        return self._get(path, size, "animation")
+
+    def _get(self, path, size, mode):
+        with self._lock:
+            return self._get_locked(path, size, mode)
+
+    def _get_locked(self, path, size, mode):
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size, size, mode)
+        image = self._entries.get(key)
+        if image is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        # The file changed on disk, any copies of the old version are dead
+        for old_key in list(self._keys_by_path.get(path, ())):
+            if old_key[1:3] != key[1:3]:
+                self._remove(old_key)
+
+        with Image.open(path) as source:
+            if mode == "animation":
+                image = animation.decode(source, size)
+            else:
+                image = source.convert(mode).resize(size)
+
+        self._entries[key] = image
+        self._keys_by_path.setdefault(path, set()).add(key)
+        self.bytes += image_bytes(image)
+        self._evict()
+        return image
+
+    def invalidate(self, path):
+        """Drop every cached copy of a file."""
+        with self._lock:
+            for key in list(self._keys_by_path.get(path, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _evict(self):
+        # Always keep the newest entry, even if it alone is over budget
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key):
+        image = self._entries.pop(key)
+        self.bytes -= image_bytes(image)
+        keys = self._keys_by_path[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_path[key[0]]
+
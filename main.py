@@ -2,10 +2,25 @@ import time
 
 import requests
 import argparse
-from PIL import Image, ImageSequence
-from sleeper_wrapper import League
+from sleeper_client import League, SLEEPER_API_URL
 import traceback
 import os
+import sys
+
+import animation
+import celebrations
+import render
+import text_layout
+from text_layout import Box
+from image_cache import ImageCache
+import nfl_schedule
+import transitions
+from fetcher import SnapshotFetcher
+from frame_recorder import FrameRecorder, MATCHUP
+from hub import HubClient, HubServer, parse_address
+from profiler import ProfileSession
+from score_history import ScoreHistory
+from status_server import StatusServer
 
 # Replace these with your Sleeper league ID and other details
 SLEEPER_LEAGUE_ID = "1116769051939786752"
@@ -20,11 +35,114 @@ def main():
         default=False,
         help="Set to True to use the RGBMatrixEmulator instead of RGBMatrix."
     )
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        help="Run without a panel or emulator, for soak runs."
+    )
+    parser.add_argument(
+        '--league',
+        default=SLEEPER_LEAGUE_ID,
+        help="Sleeper league ID to show."
+    )
+    parser.add_argument(
+        '--sleeper-url',
+        default=SLEEPER_API_URL,
+        help="Base URL of the Sleeper API, e.g. a local mock server."
+    )
+    parser.add_argument(
+        '--speed',
+        type=float,
+        default=1.0,
+        help="Run rotation and refresh intervals this many times faster."
+    )
+    parser.add_argument(
+        '--status-port',
+        type=int,
+        default=None,
+        help="Serve the current snapshot and frame over HTTP on this port."
+    )
+    parser.add_argument(
+        '--history-db',
+        default=None,
+        help="Record every score snapshot to this SQLite file."
+    )
+    parser.add_argument(
+        '--week',
+        type=int,
+        default=None,
+        help="Show this week instead of following the current NFL week."
+    )
+    parser.add_argument(
+        '--mode',
+        choices=(nfl_schedule.ACTIVE.name, nfl_schedule.IDLE.name),
+        default=None,
+        help="Stay in this mode instead of following the game windows, e.g. for soak runs."
+    )
+    parser.add_argument(
+        '--transition',
+        choices=transitions.TRANSITIONS,
+        default='slide',
+        help="Effect used when rotating between matchups."
+    )
+    parser.add_argument(
+        '--profile',
+        type=int,
+        default=None,
+        metavar='ROTATIONS',
+        help="Profile this many rotations, write profile.folded and profile.txt, then exit."
+    )
+    parser.add_argument(
+        '--record',
+        default=None,
+        metavar='PATH',
+        help="Record every frame swapped onto the panel, see frame_recorder.py."
+    )
+    parser.add_argument(
+        '--record-size',
+        type=float,
+        default=16,
+        help="Megabytes of recording to keep, older frames are dropped."
+    )
+    parser.add_argument(
+        '--serve-hub',
+        type=int,
+        default=None,
+        metavar='PORT',
+        help="Share every snapshot and logo with boards started with --hub."
+    )
+    parser.add_argument(
+        '--hub',
+        default=None,
+        metavar='HOST:PORT',
+        help="Take data from a board running --serve-hub instead of from Sleeper."
+    )
+    parser.add_argument(
+        '--no-celebrations',
+        action='store_true',
+        help="Don't animate lead changes and touchdowns."
+    )
+    parser.add_argument(
+        '--rotations',
+        type=int,
+        default=None,
+        help="Exit after this many rotations."
+    )
     args = parser.parse_args()
 
     # Import the appropriate RGBMatrix package
-    if args.emulator:
-        from RGBMatrixEmulator import RGBMatrix, RGBMatrixOptions, graphics
+    if args.headless:
+        from headless import HeadlessMatrix, HeadlessOptions
+        print("Running headless.")
+
+        options = HeadlessOptions()
+        matrix = HeadlessMatrix(options)
+
+        # Create the graphics canvas
+        canvas = matrix.CreateFrameCanvas()
+
+    elif args.emulator:
+        from RGBMatrixEmulator import RGBMatrix, RGBMatrixOptions
         print("Running in emulator mode.")
 
         # Set up the LED matrix options
@@ -41,7 +159,7 @@ def main():
 
 
     else:
-        from rgbmatrix import RGBMatrix, RGBMatrixOptions, graphics
+        from rgbmatrix import RGBMatrix, RGBMatrixOptions
         print("Running on physical LED board.")
 
         # Set up the LED matrix options
@@ -51,6 +169,7 @@ def main():
         options.brightness = 40
         options.hardware_mapping = 'adafruit-hat'  # 'regular' for most, but it could be different
         options.gpio_slowdown = 4  # Try values like 1, 2, or 3 for slowdown
+        options.limit_refresh_rate_hz = 120  # Steady refresh, lets SwapOnVSync pace transitions
         #options.pwm_lsb_nanoseconds = 150  # Improve LED refresh quality
 
         matrix = RGBMatrix(options=options)
@@ -58,26 +177,76 @@ def main():
         # Create the graphics canvas
         canvas = matrix.CreateFrameCanvas()
 
-    # Set up Sleeper League
-    my_league = League(SLEEPER_LEAGUE_ID)
-    week = 12
+    # Set up Sleeper League, unless a hub fetches it for us
+    my_league = League(args.league, args.sleeper_url) if args.hub is None else None
+
+    # Current NFL week and game windows, drives the idle mode. On a hub's
+    # board the state only ever comes from the hub
+    schedule = nfl_schedule.NflSchedule(base_url=args.sleeper_url if args.hub is None else None)
+
+    # Optional subscription to a hub, it pushes the data and the NFL state
+    hub_client = HubClient(parse_address(args.hub), schedule=schedule).start() if args.hub else None
+    base_brightness = options.brightness
+    panel_brightness = base_brightness
+
+    # Transitions are paced off the panel refresh rate
+    swap_fraction = transitions.framerate_fraction(getattr(options, 'limit_refresh_rate_hz', 0))
+    transition_pacing = transitions.PacingStats()
+    last_frame = None
+
+    # Set by --profile, times every frame put on the panel
+    profile = None
+
+    # Optional HTTP view of what the board is showing
+    status_server = StatusServer(port=args.status_port).start() if args.status_port is not None else None
+
+    # Optional score history, written in the background
+    score_history = ScoreHistory(args.history_db) if args.history_db else None
+
+    # Optional recording of every frame shown, for replaying glitches
+    frame_recorder = FrameRecorder(args.record, int(args.record_size * 1024 * 1024)) if args.record else None
+
+    # Every logo drawn goes through this, keeps memory flat over long runs
+    image_cache = ImageCache()
 
     # Load a font
     try:
         # Load a font
-        text_font = graphics.Font()
-        text_font.LoadFont("rpi-rgb-led-matrix/fonts/4x6.bdf")  # Adjust font path if needed
+        text_font = render.load_font("rpi-rgb-led-matrix/fonts/4x6.bdf")  # Adjust font path if needed
 
-        score_font = graphics.Font()
-        score_font.LoadFont("rpi-rgb-led-matrix/fonts/5x7.bdf")
-    except IOError:
+        score_font = render.load_font("rpi-rgb-led-matrix/fonts/5x7.bdf")
+    except IOError as e:
         print(f"Error loading font: {e}")
 
     # Set colors
-    white = graphics.Color(255, 255, 255)
-    red = graphics.Color(255, 0, 0)
-    green = graphics.Color(0, 255, 0)
-    black = graphics.Color(0, 0, 0)
+    white = (255, 255, 255)
+    red = (255, 0, 0)
+    green = (0, 255, 0)
+    black = (0, 0, 0)
+    amber = (255, 140, 0)
+
+    # Where text goes on the 64x32 panel, between and below the 20x20 logos
+    name1_box = Box(22, 1, 21, 9)
+    name2_box = Box(22, 11, 21, 9)
+    score1_box = Box(0, 25, 32, 7)
+    score2_box = Box(32, 25, 32, 7)
+
+    # The placeholder for a week with no matchups, across the whole panel
+    no_games_box = Box(0, 6, 64, 9)
+    no_games_week_box = Box(0, 17, 64, 9)
+
+    # Logo tiles; animated ones keep playing between rotations on their own
+    # clock, capped to a share of the CPU
+    logo_size = (20, 20)
+    logo1_position = (1, 1)
+    logo2_position = (44, 1)
+    animation_epoch = time.time()
+    animation_governor = animation.AnimationGovernor()
+
+    # Optional hub for other boards, sends them logo tiles at this size
+    hub_server = None
+    if args.serve_hub is not None:
+        hub_server = HubServer(lambda path: image_cache.get_animation(path, logo_size), port=args.serve_hub).start()
 
     def get_team_data(data_league, week):
         """Retrieve detailed team data for each matchup."""
@@ -98,13 +267,22 @@ def main():
             if logo_url:
                 try:
                     # Fetch the image data
-                    response = requests.get(logo_url)
+                    response = requests.get(logo_url, timeout=10)
                     response.raise_for_status()  # Raise exception for HTTP errors
 
-                    # Save the image to the 'logos' directory
+                    # Leave an unchanged logo alone, rewriting it would make
+                    # the image cache decode it all over again
                     file_path = os.path.join(logos_dir, f"{user['user_id']}.png")
-                    with open(file_path, "wb") as logo_file:
+                    if os.path.exists(file_path):
+                        with open(file_path, "rb") as logo_file:
+                            if logo_file.read() == response.content:
+                                continue
+
+                    # Save the image to the 'logos' directory, swapping it in
+                    # whole so a logo is never read half written
+                    with open(file_path + ".tmp", "wb") as logo_file:
                         logo_file.write(response.content)
+                    os.replace(file_path + ".tmp", file_path)
                     print(f"Downloaded logo for user {user['user_id']} to {file_path}")
                 except Exception as e:
                     print(f"Failed to download logo for user {user['user_id']}: {e}")
@@ -168,12 +346,14 @@ def main():
             print('team1_details:\n', team1_details)
 
             detailed_matchups.append({
+                "matchup_id": matchup_id,
                 "team1": {
                     "name": team1_details["team_name"],
                     "wins": team1_details["wins"],
                     "losses": team1_details["losses"],
                     "ties": team1_details["ties"],
                     "points": team1["points"],
+                    "roster_id": team1["roster_id"],
                     "logo": team1_logo_file
                 },
                 "team2": {
@@ -182,63 +362,268 @@ def main():
                     "losses": team2_details["losses"],
                     "ties": team2_details["ties"],
                     "points": team2["points"],
+                    "roster_id": team2["roster_id"],
                     "logo": team2_logo_file
                 }
             })
 
         return detailed_matchups
 
-    def draw_matchup(canvas, team1_data, team2_data, bg_color):
+    def draw_matchup(team1_data, team2_data, bg_color, stale=False):
+        # Compose the screen off-screen, it is pushed to the canvas in one go
+        frame = render.new_frame(bg_color, matrix.width, matrix.height)
+
         # Draw logos
-        draw_logos(team1_data['logo'], team2_data['logo'])
+        draw_logos(frame, load_logos(team1_data, team2_data), time.time() - animation_epoch)
+
+        # Draw team names between the logos
+        draw_names(frame, team1_data['name'], team2_data['name'])
 
         # Draw scores for both teams
-        draw_scores(canvas, team1_data['points'], team2_data['points'])
+        draw_scores(frame, team1_data['points'], team2_data['points'])
 
-        return canvas
+        # Flag scores that haven't refreshed in a while with an amber dot
+        if stale:
+            frame.paste(amber, (31, 22, 33, 24))
+
+        return frame
+
+    def draw_no_games(week, bg_color):
+        # Offseason, preseason or past the league's last week
+        frame = render.new_frame(bg_color, matrix.width, matrix.height)
+        draw_text_in_box(frame, text_font, no_games_box, white, "No games")
+        draw_text_in_box(frame, text_font, no_games_week_box, white, f"Week {week}")
+        return frame
+
+    def draw_text_in_box(frame, font, box, color, text):
+        # Fitting and centering are memoized, so this is cheap every frame
+        placed = text_layout.layout(font, text, box)
+        render.draw_text(frame, font, placed.x, placed.y, color, placed.text)
+
+    def draw_names(frame, team1_name, team2_name):
+        draw_text_in_box(frame, text_font, name1_box, white, team1_name)
+        draw_text_in_box(frame, text_font, name2_box, white, team2_name)
 
-    def draw_scores(canvas, team1_score, team2_score):
+    def draw_scores(frame, team1_score, team2_score):
         # Draw team scores and records (static text)
         if team1_score > team2_score:
-            graphics.DrawText(canvas, score_font, 1, 31, green, str(team1_score))
-            graphics.DrawText(canvas, score_font, 35, 31, red, str(team2_score))
+            draw_text_in_box(frame, score_font, score1_box, green, str(team1_score))
+            draw_text_in_box(frame, score_font, score2_box, red, str(team2_score))
         elif team2_score > team1_score:
-            graphics.DrawText(canvas, score_font, 1, 31, red, str(team1_score))
-            graphics.DrawText(canvas, score_font, 35, 31, green, str(team2_score))
+            draw_text_in_box(frame, score_font, score1_box, red, str(team1_score))
+            draw_text_in_box(frame, score_font, score2_box, green, str(team2_score))
         else:
-            graphics.DrawText(canvas, score_font, 1, 31, white, str(team1_score))
-            graphics.DrawText(canvas, score_font, 35, 31, white, str(team2_score))
+            draw_text_in_box(frame, score_font, score1_box, white, str(team1_score))
+            draw_text_in_box(frame, score_font, score2_box, white, str(team2_score))
 
         # graphics.DrawText(matrix, text_font, 1, 12, white, record1)
         # graphics.DrawText(matrix, text_font, 1, 31, white, record2)
 
 
-    def draw_logos(team1_logo_path, team2_logo_path):
-        logo1 = ""
-        logo2 = ""
-
-        if team1_logo_path is not None:
-            logo1 = Image.open(team1_logo_path)
-            logo1 = logo1.resize((20, 20))
-        if team2_logo_path is not None:
-            logo2 = Image.open(team2_logo_path)
-            logo2 = logo2.resize((20, 20))
+    def load_logos(team1_data, team2_data):
+        """Return (LogoAnimation, position) for each team's logo tile."""
+        logos = []
+        for team_data, position in ((team1_data, logo1_position), (team2_data, logo2_position)):
+            # Decoded once and shared by every matchup showing the team;
+            # frames keep their alpha, Sleeper avatars are mostly RGBA
+            if team_data['logo'] is None:
+                continue
+            if hub_client is not None:
+                # Hub snapshots name tiles the hub has already sent
+                logo = hub_client.logo(team_data['logo'])
+                if logo is not None:
+                    logos.append((logo, position))
+            else:
+                logos.append((image_cache.get_animation(team_data['logo'], logo_size), position))
+        return logos
+
+    def draw_logos(frame, logos, t):
+        # Draw team logo for both teams, transparent parts show the background
+        for logo, position in logos:
+            tile = logo.frame_at(t)
+            frame.paste(tile, position, tile)
+
+    def advance_logos(frame, logos, bg_color, t):
+        """Copy of frame with its animated logo tiles moved on to time t."""
+        frame = frame.copy()
+        for logo, position in logos:
+            if logo.animated:
+                frame.paste(bg_color, position + (position[0] + logo_size[0], position[1] + logo_size[1]))
+                tile = logo.frame_at(t)
+                frame.paste(tile, position, tile)
+        return frame
+
+    def next_logo_tick(logos, now):
+        """When animated logos next need redrawing, inf if none are animated."""
+        t = now - animation_epoch
+        wanted = min((logo.next_change(t) for logo, _ in logos), default=float('inf'))
+        if wanted == float('inf'):
+            return wanted
+        return animation_governor.next_tick(now, animation_epoch + wanted)
+
+    def render_celebration(events, matchup):
+        """Frames for one matchup's score events, ending on its new screen.
+
+        Runs on the celebration thread, as soon as the events are detected.
+        """
+        team1_data, team2_data = matchup['team1'], matchup['team2']
+        frames = []
+
+        # Count the scores that moved up from where they were
+        steps = int(round(celebrations.ROLL_UP_SECONDS * celebrations.FPS))
+        rolls = {
+            event.side: celebrations.roll_up(event.old_points, event.new_points, steps)
+            for event in events if event.new_points != event.old_points
+        }
+        if rolls:
+            for step in range(steps):
+                rolled1 = {**team1_data, 'points': rolls['team1'][step]} if 'team1' in rolls else team1_data
+                rolled2 = {**team2_data, 'points': rolls['team2'][step]} if 'team2' in rolls else team2_data
+                frames.append(draw_matchup(rolled1, rolled2, black))
+        final = draw_matchup(team1_data, team2_data, black)
+
+        # Pulse the logo of a team that just took the lead
+        logos = {position: logo for logo, position in load_logos(team1_data, team2_data)}
+        for event in events:
+            if event.kind == celebrations.LEAD_CHANGE:
+                position = logo1_position if event.side == 'team1' else logo2_position
+                if position in logos:
+                    tile = logos[position].frame_at(time.time() - animation_epoch)
+                    frames += celebrations.pulse_frames(final, tile, position, black)
+
+        # Then flash the most important score, ending on the plain screen
+        side = min(events, key=lambda event: celebrations.PRIORITIES[event.kind]).side
+        frames += celebrations.flash_frames(final, score1_box if side == 'team1' else score2_box, amber)
+        return frames
+
+    def set_brightness(canvas):
+        canvas.brightness = panel_brightness
+
+    def show_frame(canvas, frame, transition='cut', matchup=False, started=None):
+        """Push a composed frame to the panel and return the new back buffer.
+
+        matchup marks a frame straight from draw_matchup in the recording.
+        started is when composing the frame began, for the profile's frame
+        times.
+        """
+        nonlocal last_frame
+        started = time.perf_counter() if started is None else started
+
+        frames = transitions.build_transition(transition, last_frame, frame)
+
+        def record(shown):
+            # A transition ends on a copy of frame, flag that last step
+            flags = MATCHUP if matchup and shown is frames[-1] else 0
+            frame_recorder.record(shown, flags)
+
+        pacing = transition_pacing if len(frames) > 1 else None
+        canvas = transitions.play(matrix, canvas, frames, swap_fraction, pacing, before_swap=set_brightness,
+                                  after_swap=record if frame_recorder is not None else None,
+                                  work=profile.record_frame if profile is not None else None, started=started)
+        last_frame = frame
+
+        if status_server is not None:
+            status_server.publish_frame(frame)
+        return canvas
 
-        # Draw team logo for both teams
-        if logo1:
-            matrix.SetImage(logo1.convert('RGB'), 1, 1)
-        if logo2:
-            matrix.SetImage(logo2.convert('RGB'), 44, 1)
+    def warm_layouts(matchup_data):
+        """Lay out the names and scores of a new snapshot before they're drawn."""
+        for matchup in matchup_data:
+            text_layout.warm(text_font, [matchup['team1']['name']], name1_box)
+            text_layout.warm(text_font, [matchup['team2']['name']], name2_box)
+            text_layout.warm(score_font, [str(matchup['team1']['points'])], score1_box)
+            text_layout.warm(score_font, [str(matchup['team2']['points'])], score2_box)
+
+    def scores_moved(old_data, new_data):
+        """Whether any team's points changed between two snapshots of a week."""
+        old_points = {
+            team['roster_id']: team['points'] for matchup in old_data for team in (matchup['team1'], matchup['team2'])
+        }
+        return any(
+            old_points.get(team['roster_id'], team['points']) != team['points']
+            for matchup in new_data for team in (matchup['team1'], matchup['team2'])
+        )
+
+    def publish_snapshot(matchup_data, week, stale=False):
+        if status_server is not None:
+            status_server.publish_snapshot(matchup_data, week=week, stale=stale)
+        if score_history is not None:
+            score_history.record(args.league, week, matchup_data)
+        if hub_server is not None:
+            hub_server.publish(matchup_data, week, nfl_state=schedule.state())
+
+    def current_mode(now=None):
+        """The schedule's mode, or the one --mode pins, with its intervals
+        scaled by --speed."""
+        if args.mode is not None:
+            mode = nfl_schedule.ACTIVE if args.mode == nfl_schedule.ACTIVE.name else nfl_schedule.IDLE
+        else:
+            mode = schedule.mode(now)
+        return mode._replace(
+            refresh_interval=mode.refresh_interval / args.speed,
+            rotation_interval=mode.rotation_interval / args.speed,
+        )
 
     def display_scores(canvas, display_league):
         """Display live fantasy football scores on the LED matrix."""
+        nonlocal panel_brightness, profile
+
+        # Lead changes and touchdowns are rendered in the background and
+        # played between rotations
+        celebration_queue = celebrations.CelebrationQueue(render_celebration) if not args.no_celebrations else None
+
         try:
             print("Press CTRL-C to stop.")
 
-            display_week = 12
+            if hub_client is not None:
+                # The hub's first snapshot brings the NFL state with it
+                hub_client.wait_for_first()
+            else:
+                # Only startup waits on the NFL state, later refreshes run
+                # in the background
+                schedule.wait_for_first()
+
+            display_week = args.week or schedule.week()
+            mode = current_mode()
+            panel_brightness = max(1, int(base_brightness * mode.brightness_scale))
+            animation_governor.set_max_fps(mode.animation_fps)
+            print(f"Showing week {display_week}, {mode.name} mode")
+
+            # Sample stacks and time frames when asked to
+            profile = ProfileSession(args.profile).start() if args.profile else None
+
+            # Counters for /stats.json
+            run_stats = {'rotations': 0, 'refreshes': 0, 'last_refresh_seconds': None}
+
+            def fetch_week(week):
+                refresh_start = time.perf_counter()
+                data = get_team_data(display_league, week)
+                refresh_seconds = time.perf_counter() - refresh_start
+                run_stats['refreshes'] += 1
+                run_stats['last_refresh_seconds'] = refresh_seconds
+                if profile is not None:
+                    profile.record_refresh(refresh_seconds)
+                return data
+
+            # Data is refreshed in the background, the loop only ever reads
+            # the last good snapshot
+            if hub_client is not None:
+                fetcher = hub_client
+                fetcher.stale_after = 3 * mode.refresh_interval
+            else:
+                fetcher = SnapshotFetcher(fetch_week, stale_after=3 * mode.refresh_interval)
+
+            # The celebration playing, if any, and when its next frame is due
+            celebration = None
+            celebration_step = 0
+            next_celebration_time = float('inf')
 
             # Initial data fetch and processing
-            matchup_data = get_team_data(display_league, display_week)
+            matchup_data = fetcher.wait_for_first(display_week)
+            shown_week = fetcher.snapshot_args[0]
+            fetcher.updated.clear()
+            warm_layouts(matchup_data)
+            publish_snapshot(matchup_data, shown_week, stale=fetcher.is_stale())
 
             print(f'Data: {matchup_data}')
             print('Matchups')
@@ -247,67 +632,211 @@ def main():
 
             # Create a list of screens dynamically based on the provided data
             screens = [
-                (team1_key, team1_data, team2_key, team2_data)
+                ('team1', matchup['team1'], 'team2', matchup['team2'])
                 for matchup in matchup_data
-                for (team1_key, team1_data), (team2_key, team2_data) in [list(matchup.items())]
             ]
 
             # Initialize screen index
             current_screen_index = 0
 
-            # Rotation interval between screens in seconds
-            rotation_interval = 10
-
-            # Time tracking
+            # Time tracking, the intervals come from the current mode
             last_switch_time = time.time()
-            data_refresh_interval = 60
             last_refresh_time = time.time()
 
             # Draw initial screen
-            # Unpack current screen data
-            team1_key, team1_data, team2_key, team2_data = screens[current_screen_index]
+            if screens:
+                # Unpack current screen data
+                team1_key, team1_data, team2_key, team2_data = screens[current_screen_index]
 
-            # Draw the current matchups's screen with the scrolling text
-            canvas = draw_matchup(canvas, team1_data, team2_data, black)
+                # Draw the current matchups's screen with the scrolling text
+                frame = draw_matchup(team1_data, team2_data, black)
 
-            # Swap the canvas to update the display
-            # canvas = matrix.SwapOnVSync(canvas)
+                # Swap the canvas to update the display
+                canvas = show_frame(canvas, frame, matchup=True)
+                screen_logos = load_logos(team1_data, team2_data)
+            else:
+                # Nothing to rotate through, keep polling until the week has games
+                canvas = show_frame(canvas, draw_no_games(shown_week, black))
+                screen_logos = []
+            next_animation_time = next_logo_tick(screen_logos, time.time())
 
             while True:
                 current_time = time.time()
 
+                # Switch between active and idle as game windows open and close
+                new_mode = current_mode(current_time)
+                if new_mode.name != mode.name:
+                    print(f"Switching to {new_mode.name} mode")
+                    mode = new_mode
+                    panel_brightness = max(1, int(base_brightness * mode.brightness_scale))
+                    # Idle boards tick animated logos over rarely, every
+                    # tick is a swap, a recorder write and a status frame
+                    animation_governor.set_max_fps(mode.animation_fps)
+                    fetcher.stale_after = 3 * mode.refresh_interval
+                    if mode.name == nfl_schedule.ACTIVE.name:
+                        # Games just started, don't wait out the idle poll
+                        last_refresh_time = 0
+
                 # Check if it's time to refresh the data and logos
-                if current_time - last_refresh_time >= data_refresh_interval:
-                    matchup_data = get_team_data(display_league, display_week)
+                if current_time - last_refresh_time >= mode.refresh_interval:
+                    # Picks up the new week once Sleeper rolls over
+                    display_week = args.week or schedule.week(current_time)
+                    fetcher.revalidate(display_week)
+
+                    # reset last refresh time
+                    last_refresh_time = current_time
+
+                # Pick up a snapshot the background fetch has just finished
+                if fetcher.updated.is_set():
+                    fetcher.updated.clear()
+                    previous_data, previous_week = matchup_data, shown_week
+                    matchup_data = fetcher.snapshot
+                    shown_week = fetcher.snapshot_args[0]
+                    warm_layouts(matchup_data)
+                    publish_snapshot(matchup_data, shown_week, stale=fetcher.is_stale())
+
+                    # Points moving means games are on, whatever the windows say
+                    if shown_week == previous_week and scores_moved(previous_data, matchup_data):
+                        schedule.scores_changed(current_time)
+
+                    # Scores start over with a new week, nothing to celebrate
+                    if celebration_queue is not None and shown_week == previous_week:
+                        events = celebrations.detect_events(previous_data, matchup_data)
+                        if events:
+                            print(f"Score events: {events}")
+                            celebration_queue.submit(events, matchup_data)
+                    print(f"Image cache: {image_cache.stats()}")
+                    print(f"Transition pacing: {transition_pacing.stats()}")
+                    print(f"Fetcher: {fetcher.stats}, circuit {fetcher.breaker.state}")
+                    if frame_recorder is not None:
+                        print(f"Recorder: {frame_recorder.stats()}")
 
                     # Create a list of screens dynamically based on the provided data
                     screens = [
-                        (team1_key, team1_data, team2_key, team2_data)
+                        ('team1', matchup['team1'], 'team2', matchup['team2'])
                         for matchup in matchup_data
-                        for (team1_key, team1_data), (team2_key, team2_data) in [list(matchup.items())]
                     ]
 
-                    # reset last refresh time
-                    last_refresh_time = current_time
+                    if not screens:
+                        # The week has no games (any more), stop rotating
+                        celebration = None
+                        next_celebration_time = float('inf')
+                        if previous_data or shown_week != previous_week:
+                            canvas = show_frame(canvas, draw_no_games(shown_week, black))
+                            screen_logos = []
+                            next_animation_time = float('inf')
+                    elif not previous_data:
+                        # Games are back, rotate onto the first one right away
+                        current_screen_index = -1
+                        last_switch_time = 0
+
+                # A celebration that has finished rendering cuts into the rotation
+                if celebration is None and celebration_queue is not None and screens:
+                    celebration = celebration_queue.pop(current_time)
+                    if celebration is not None:
+                        celebration_step = 0
+                        next_celebration_time = current_time
+
+                # Play it a frame per pass, so nothing else waits on it
+                if celebration is not None and time.time() >= next_celebration_time:
+                    last_step = celebration_step == len(celebration.frames) - 1
+                    canvas = show_frame(canvas, celebration.frames[celebration_step], matchup=last_step)
+                    celebration_step += 1
+                    next_celebration_time += 1 / celebrations.FPS
+                    if last_step:
+                        # Rotate on from the celebrated matchup
+                        for index, matchup in enumerate(matchup_data):
+                            if matchup['matchup_id'] == celebration.matchup_id:
+                                current_screen_index = index
+                        team1_key, team1_data, team2_key, team2_data = screens[current_screen_index]
+                        screen_logos = load_logos(team1_data, team2_data)
+                        next_animation_time = next_logo_tick(screen_logos, time.time())
+                        last_switch_time = time.time()
+                        celebration = None
+                        next_celebration_time = float('inf')
 
                 # Check if it's time to switch the screen
-                if current_time - last_switch_time >= rotation_interval:
-                    canvas.Clear()
-
+                if celebration is None and screens and current_time - last_switch_time >= mode.rotation_interval:
                     current_screen_index = (current_screen_index + 1) % len(screens)
                     last_switch_time = current_time
 
                     # Unpack new screen data
                     team1_key, team1_data, team2_key, team2_data = screens[current_screen_index]
+                    rotation_start = time.perf_counter()
 
                     # Draw the new matchups's screen with the scrolling text
-                    canvas = draw_matchup(canvas, team1_data, team2_data, black)
+                    frame = draw_matchup(team1_data, team2_data, black, stale=fetcher.is_stale(current_time))
 
                     # Swap the canvas to update the display
-                    canvas = matrix.SwapOnVSync(canvas)
+                    canvas = show_frame(canvas, frame, args.transition, matchup=True, started=rotation_start)
+                    screen_logos = load_logos(team1_data, team2_data)
+                    next_animation_time = next_logo_tick(screen_logos, time.time())
+
+                    run_stats['rotations'] += 1
+                    if status_server is not None:
+                        # Data goes stale between refreshes, not only when one lands;
+                        # an unchanged snapshot isn't re-encoded
+                        status_server.publish_snapshot(
+                            matchup_data, week=shown_week, stale=fetcher.is_stale(current_time))
+                        status_server.publish_stats({
+                            **run_stats,
+                            'mode': mode.name,
+                            'stale': fetcher.is_stale(current_time),
+                            'fetcher': fetcher.stats,
+                            'circuit': fetcher.breaker.state,
+                            'image_cache': image_cache.stats(),
+                            'transitions': transition_pacing.stats(),
+                            'animation': animation_governor.stats(),
+                            'recorder': frame_recorder.stats() if frame_recorder is not None else None,
+                            'celebrations': celebration_queue.stats() if celebration_queue is not None else None,
+                            'hub': hub_server.stats if hub_server is not None else None,
+                        })
+
+                    if profile is not None:
+                        profile.record_rotation()
+                        if profile.done:
+                            profile.finish()
+                            return
+
+                    if args.rotations is not None and run_stats['rotations'] >= args.rotations:
+                        return
+
+                # Advance animated logos, independent of the rotation
+                if celebration is None and time.time() >= next_animation_time:
+                    tick_cpu_start = time.thread_time()
+                    tick_start = time.perf_counter()
+                    frame = advance_logos(last_frame, screen_logos, black, time.time() - animation_epoch)
+                    canvas = show_frame(canvas, frame, started=tick_start)
+                    animation_governor.record(time.thread_time() - tick_cpu_start)
+                    next_animation_time = next_logo_tick(screen_logos, time.time())
+
+                # Sleep until the next rotation, refresh, game window, logo or
+                # celebration frame, or until fresh data comes in
+                wake_time = min(
+                    last_switch_time + mode.rotation_interval,
+                    last_refresh_time + mode.refresh_interval,
+                    schedule.next_change(current_time),
+                    next_animation_time,
+                    next_celebration_time,
+                )
+                if celebration_queue is not None and celebration_queue.pending:
+                    # Check back soon for celebrations still rendering
+                    wake_time = min(wake_time, time.time() + 1 / celebrations.FPS)
+                fetcher.updated.wait(max(0.0, min(wake_time - time.time(), mode.rotation_interval)))
 
         except KeyboardInterrupt:
             sys.exit(0)
+        finally:
+            if score_history is not None:
+                score_history.close()
+            if frame_recorder is not None:
+                frame_recorder.close()
+            if celebration_queue is not None:
+                celebration_queue.close()
+            if hub_client is not None:
+                hub_client.close()
+            if hub_server is not None:
+                hub_server.stop()
 
     # Start displaying scores
     display_scores(canvas, my_league)
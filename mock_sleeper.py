@@ -0,0 +1,240 @@
+"""A local stand-in for the Sleeper API and its avatar CDN.
+
+Serves the endpoints the board uses for any number of generated leagues:
+
+    /v1/state/nfl
+    /v1/league/<id>
+    /v1/league/<id>/users
+    /v1/league/<id>/rosters
+    /v1/league/<id>/matchups/<week>
+    /avatars/<user_id>-<version>.png
+
+Scores climb over a game clock that can run faster than real time, avatars
+change now and then (a quarter of them are animated GIFs by default), and
+requests can be slowed down or failed at random to exercise the board's
+fetch and retry paths. For repeatable runs the clock can be stopped at a
+fixed game hour. Weeks after last_week have no matchups, like the offseason.
+"""
+import io
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+FIRST_LEAGUE_ID = 900000000000000000
+
+
+class MockSleeper:
+    """Generated leagues behind a local HTTP server."""
+
+    def __init__(self, leagues=1, teams=12, week=12, speed=1.0, latency=0.0,
+                 spike_rate=0.0, spike_seconds=2.0, error_rate=0.0, churn_per_hour=0.5,
+                 gif_share=0.25, clock_hours=None, last_week=None, host="127.0.0.1", port=0, seed=0):
+        self.league_ids = [str(FIRST_LEAGUE_ID + i) for i in range(leagues)]
+        self.teams = teams
+        self.week = week
+        self.speed = speed
+        self.latency = latency
+        self.spike_rate = spike_rate
+        self.spike_seconds = spike_seconds
+        self.error_rate = error_rate
+        self.churn_per_hour = churn_per_hour
+        self.gif_share = gif_share
+        self.clock_hours = clock_hours
+        self.last_week = last_week
+        self.started_at = time.time()
+        self.requests = 0
+        self.errors = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._avatars = {}
+
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                mock._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-sleeper", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def game_hours(self):
+        """Hours on the accelerated game clock since the server started."""
+        if self.clock_hours is not None:
+            return self.clock_hours
+        return (time.time() - self.started_at) * self.speed / 3600
+
+    # -- data
+
+    def _user_id(self, league_id, team):
+        return f"{league_id}{team:02d}"
+
+    def _avatar_version(self, user_id):
+        # Each user changes avatar about churn_per_hour times per game hour,
+        # staggered so they don't all change together
+        offset = zlib.crc32(user_id.encode()) % 1000 / 1000
+        return int(self.game_hours() * self.churn_per_hour + offset)
+
+    def users(self, league_id, base):
+        return [
+            {
+                "user_id": self._user_id(league_id, team),
+                "display_name": f"owner{team}",
+                "metadata": {
+                    "team_name": f"Team {team} of {league_id[-3:]}",
+                    "avatar": f"{base}/avatars/{self._user_id(league_id, team)}-"
+                              f"{self._avatar_version(self._user_id(league_id, team))}.png",
+                },
+            }
+            for team in range(self.teams)
+        ]
+
+    def rosters(self, league_id):
+        return [
+            {
+                "roster_id": team + 1,
+                "owner_id": self._user_id(league_id, team),
+                "settings": {"wins": team % 9, "losses": 8 - team % 9, "ties": 0},
+            }
+            for team in range(self.teams)
+        ]
+
+    def matchups(self, league_id, week):
+        if self.last_week is not None and week > self.last_week:
+            return []
+        hours = min(self.game_hours(), 3.5)
+        matchups = []
+        for team in range(self.teams):
+            seed = zlib.crc32(f"{league_id}-{week}-{team}".encode())
+            rate = 25 + seed % 20  # points per game hour
+            wobble = (seed >> 8) % 7 * (hours % 0.37)
+            matchups.append({
+                "roster_id": team + 1,
+                "matchup_id": team // 2 + 1,
+                "points": round(rate * hours + wobble, 2),
+            })
+        return matchups
+
+    def avatar(self, name):
+        """PNG or GIF bytes for an avatar, generated from its name."""
+        body = self._avatars.get(name)
+        if body is None:
+            seed = zlib.crc32(name.encode())
+            image = Image.new("RGBA", (64, 64), (seed & 0xFF, seed >> 8 & 0xFF, seed >> 16 & 0xFF, 255))
+            image.paste((255, 255, 255, 0), (16, 16, 48, 48))
+            buffer = io.BytesIO()
+            if seed % 100 < self.gif_share * 100:
+                # Some avatars are animated GIFs
+                frames = [image.rotate(angle) for angle in range(0, 360, 45)]
+                frames[0].save(buffer, format="GIF", save_all=True, append_images=frames[1:],
+                               duration=80, loop=0)
+            else:
+                image.save(buffer, format="PNG")
+            body = buffer.getvalue()
+            with self._lock:
+                # Only the latest versions are requested, keep the cache small
+                if len(self._avatars) > 4 * self.teams * len(self.league_ids):
+                    self._avatars.clear()
+                self._avatars[name] = body
+        return body
+
+    # -- HTTP
+
+    def _handle(self, request):
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            spike = self._random.random() < self.spike_rate
+
+        delay = self.latency + (self.spike_seconds if spike else 0)
+        if delay:
+            time.sleep(delay)
+        if roll < self.error_rate:
+            with self._lock:
+                self.errors += 1
+            request.send_error(503, "Injected failure")
+            return
+
+        host, port = self.httpd.server_address[:2]
+        base = f"http://{host}:{port}"
+        parts = request.path.split("?", 1)[0].strip("/").split("/")
+
+        if parts[0] == "avatars" and len(parts) == 2:
+            self._send(request, self.avatar(parts[1]), "image/png")
+            return
+        if parts[0] != "v1":
+            request.send_error(404)
+            return
+
+        parts = parts[1:]
+        if parts == ["state", "nfl"]:
+            body = {"week": self.week, "display_week": self.week, "season_type": "regular", "season": "2026"}
+        elif len(parts) >= 2 and parts[0] == "league" and parts[1] in self.league_ids:
+            league_id = parts[1]
+            if len(parts) == 2:
+                body = {"league_id": league_id, "name": f"Mock league {league_id}", "total_rosters": self.teams}
+            elif parts[2:] == ["users"]:
+                body = self.users(league_id, base)
+            elif parts[2:] == ["rosters"]:
+                body = self.rosters(league_id)
+            elif len(parts) == 4 and parts[2] == "matchups" and parts[3].isdigit():
+                body = self.matchups(league_id, int(parts[3]))
+            else:
+                request.send_error(404)
+                return
+        else:
+            request.send_error(404)
+            return
+        self._send(request, json.dumps(body).encode("utf-8"), "application/json")
+
+    def _send(self, request, body, content_type):
+        request.send_response(200)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a mock Sleeper API.")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--leagues', type=int, default=1)
+    parser.add_argument('--teams', type=int, default=12)
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--spike-rate', type=float, default=0.0)
+    parser.add_argument('--last-week', type=int, default=None, help="Serve no matchups after this week.")
+    args = parser.parse_args()
+
+    server = MockSleeper(leagues=args.leagues, teams=args.teams, speed=args.speed, port=args.port,
+                         error_rate=args.error_rate, spike_rate=args.spike_rate, last_week=args.last_week).start()
+    print(f"Mock Sleeper API at {server.url}, leagues: {', '.join(server.league_ids)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
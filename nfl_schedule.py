@@ -0,0 +1,191 @@
+"""NFL state and game windows, used to decide how hard the board works.
+
+The current week and season type come from Sleeper's /state/nfl endpoint and
+are cached, so the week rolls over on its own. Outside of game windows the
+board drops into an idle mode: it polls rarely, rotates slowly, dims the
+panel and plays animated logos at a frame a second, then wakes back up when the next window opens. Holidays add windows
+of their own, and scores moving outside any window (a game the table doesn't
+know about) keep the board active for a while too.
+
+The state is refreshed on a background thread; week() and mode() only read
+the cached copy, so a slow or failing Sleeper never stalls the display loop.
+With no base_url the schedule never fetches, and set_state() is its only
+source, e.g. a board subscribed to a hub.
+"""
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import requests
+
+from fetcher import backoff_delay
+from sleeper_client import REQUEST_TIMEOUT, SLEEPER_API_URL
+
+STATE_TTL = 60 * 60  # seconds; Sleeper flips the week once, midweek
+RETRY_AFTER = 5 * 60  # seconds before a failed refresh is tried again
+
+EASTERN = ZoneInfo("America/New_York")
+
+# (weekday, start hour, end hour) in Eastern time, Monday is 0. End hours past
+# 24 run into the next morning for games that go long.
+GAME_WINDOWS = [
+    (3, 19.5, 24.75),  # Thursday night
+    (5, 12.5, 24.75),  # Saturday, late in the season
+    (6, 9.0, 24.75),  # Sunday, from the London games on
+    (0, 19.0, 24.75),  # Monday night, doubleheaders kick off earlier
+]
+SATURDAY_GAMES_FROM_WEEK = 15
+
+# (start hour, end hour) of the holiday games, on top of the weekly windows
+THANKSGIVING_WINDOW = (12.0, 24.75)
+BLACK_FRIDAY_WINDOW = (14.5, 20.0)
+CHRISTMAS_WINDOW = (12.0, 24.75)
+
+LIVE_SCORES_GRACE = 30 * 60  # seconds a score change keeps the board active
+
+def thanksgiving(year):
+    """The fourth Thursday of November."""
+    first = date(year, 11, 1)
+    return first + timedelta(days=(3 - first.weekday()) % 7 + 21)
+
+
+def holiday_windows(day):
+    """(start hour, end hour) of the holiday games on a date, if any."""
+    day = day.date() if isinstance(day, datetime) else day
+    if day == thanksgiving(day.year):
+        return [THANKSGIVING_WINDOW]
+    if day == thanksgiving(day.year) + timedelta(days=1):
+        return [BLACK_FRIDAY_WINDOW]
+    if (day.month, day.day) == (12, 25):
+        return [CHRISTMAS_WINDOW]
+    return []
+
+
+Mode = namedtuple("Mode", "name refresh_interval rotation_interval brightness_scale animation_fps")
+
+ACTIVE = Mode("active", refresh_interval=60, rotation_interval=10, brightness_scale=1.0, animation_fps=12)
+IDLE = Mode("idle", refresh_interval=30 * 60, rotation_interval=60, brightness_scale=0.25, animation_fps=1)
+
+
+class NflSchedule:
+    """Caches Sleeper's NFL state and works out when games are on."""
+
+    def __init__(self, state_ttl=STATE_TTL, base_url=SLEEPER_API_URL):
+        self.state_ttl = state_ttl
+        self.state_url = f"{base_url.rstrip('/')}/state/nfl" if base_url else None
+        self.last_error = None
+        self._state = None
+        self._state_time = 0
+        self._next_refresh = 0
+        self._lock = threading.Lock()
+        self._refreshing = None
+        self._live_until = 0
+
+    def state(self, now=None):
+        """Return the cached NFL state, None until the first fetch lands.
+
+        Once the state is older than the TTL a background refresh starts; a
+        failed refresh keeps serving the last state and is retried after a
+        short while rather than a full TTL.
+        """
+        now = time.time() if now is None else now
+        if self.state_url is not None and now >= self._next_refresh:
+            self.refresh()
+        return self._state
+
+    def refresh(self):
+        """Fetch the state on a background thread, unless one is running."""
+        with self._lock:
+            if self._refreshing is not None and self._refreshing.is_alive():
+                return self._refreshing
+            self._refreshing = threading.Thread(target=self._fetch, name="nfl-state", daemon=True)
+        self._refreshing.start()
+        return self._refreshing
+
+    def _fetch(self):
+        try:
+            response = requests.get(self.state_url, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            self.set_state(response.json())
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
+            self._next_refresh = time.time() + RETRY_AFTER
+            if self._state is not None:
+                print(f"Failed to refresh NFL state, keeping week {self.week()}: {e}")
+
+    def wait_for_first(self):
+        """Block until there is a state, retrying for as long as it takes."""
+        attempt = 0
+        while self._state is None:
+            self.refresh().join(REQUEST_TIMEOUT + 5)
+            if self._state is None:
+                delay = backoff_delay(attempt, cap=60)
+                print(f"No NFL state yet ({self.last_error}), retrying in {delay:.0f}s")
+                time.sleep(delay)
+                attempt += 1
+        return self._state
+
+    def set_state(self, state, now=None):
+        """Use a state fetched elsewhere, e.g. pushed by a hub."""
+        self._state = state
+        self._state_time = time.time() if now is None else now
+        self._next_refresh = self._state_time + self.state_ttl
+
+    def week(self, now=None):
+        state = self.state(now) or {}
+        return state.get("display_week") or state.get("week") or 1
+
+    def in_season(self, now=None):
+        return (self.state(now) or {}).get("season_type") in ("regular", "post")
+
+    def scores_changed(self, now=None):
+        """Note that a refresh just saw points move, games are on whatever
+        the windows say."""
+        now = time.time() if now is None else now
+        self._live_until = now + LIVE_SCORES_GRACE
+
+    def _windows(self, now):
+        """Yield (start, end) datetimes of windows overlapping from yesterday on."""
+        today = datetime.fromtimestamp(now, EASTERN).replace(hour=0, minute=0, second=0, microsecond=0)
+        week = self.week(now)
+        for day_offset in range(-1, 8):
+            day = today + timedelta(days=day_offset)
+            for weekday, start, end in GAME_WINDOWS:
+                if day.weekday() != weekday:
+                    continue
+                if weekday == 5 and week < SATURDAY_GAMES_FROM_WEEK:
+                    continue
+                yield day + timedelta(hours=start), day + timedelta(hours=end)
+            for start, end in holiday_windows(day):
+                yield day + timedelta(hours=start), day + timedelta(hours=end)
+
+    def mode(self, now=None):
+        """Return ACTIVE during a game window or while scores are moving in
+        season, IDLE otherwise."""
+        now = time.time() if now is None else now
+        if self.in_season(now):
+            if now < self._live_until:
+                return ACTIVE
+            for start, end in self._windows(now):
+                if start.timestamp() <= now < end.timestamp():
+                    return ACTIVE
+        return IDLE
+
+    def next_change(self, now=None):
+        """Timestamp of the next window boundary, so an idle board can sleep
+        right up until it has to wake."""
+        now = time.time() if now is None else now
+        boundaries = [
+            ts for window in self._windows(now) for ts in (window[0].timestamp(), window[1].timestamp())
+            if ts > now
+        ]
+        # Also wake for the next state refresh, that's where rollover shows
+        # up; one that is already due is running in the background
+        if self.state_url is not None and self._next_refresh > now:
+            boundaries.append(self._next_refresh)
+        if self._live_until > now:
+            boundaries.append(self._live_until)
+        return min(boundaries, default=now + self.state_ttl)
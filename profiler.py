@@ -0,0 +1,213 @@
+"""Built-in sampling profiler for when a board stutters in the field.
+
+A background thread snapshots every other thread's Python stack at a fixed
+interval with sys._current_frames(). Samples are kept as tuples of code
+objects and only turned into labels for the report. A thread sleeping or
+waiting (the display loop between frames, the status server, idle workers)
+is only counted per thread, so the stacks show where the work goes. That
+keeps the overhead low and needs nothing installed on the Pi. At the end of
+a run it writes:
+
+- <name>.folded: collapsed stacks, one "thread;outer;...;inner count" per
+  line, ready for flamegraph.pl or speedscope;
+- a report with the time each swapped frame took to compose and put up,
+  refresh latencies, idle samples per thread and the functions the most
+  samples were spent in.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Upper bounds of the frame time histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS_MS = (5, 10, 20, 50, 100, 250, 500, 1000, float("inf"))
+
+
+# Where an idle thread sits: (file, function) of its innermost frame
+IDLE_FUNCTIONS = {
+    ("transitions.py", "_wait_for_slot"),
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("socket.py", "readinto"),
+    ("socket.py", "accept"),
+}
+
+_labels = {}
+
+
+def _code_label(code):
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label
+
+
+_idle_codes = {}
+
+
+def _is_idle(code):
+    idle = _idle_codes.get(code)
+    if idle is None:
+        idle = _idle_codes[code] = (os.path.basename(code.co_filename), code.co_name) in IDLE_FUNCTIONS
+    return idle
+
+
+class SamplingProfiler:
+    """Collects stack samples from all threads but its own."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.stacks = Counter()  # (thread name, code, ...) outermost first
+        self.samples = 0
+        self.idle = Counter()  # thread name -> samples spent sleeping or waiting
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        threads = {}  # ident -> (name, daemon), refreshed when a new thread shows up
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in threads:
+                    threads = {thread.ident: thread.name for thread in threading.enumerate()}
+                name = threads.get(thread_id, str(thread_id))
+                if _is_idle(frame.f_code):
+                    self.idle[name] += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                stack.append(name)
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    def labelled_stacks(self):
+        """[(labels, count), ...] most common first, thread name leading."""
+        return [
+            ((stack[0], *map(_code_label, stack[1:])), count)
+            for stack, count in self.stacks.most_common()
+        ]
+
+    def write_collapsed(self, path):
+        with open(path, "w") as out:
+            for stack, count in self.labelled_stacks():
+                out.write(";".join(stack) + f" {count}\n")
+
+    def top(self, n=15):
+        """Return [(function, self samples, total samples), ...] by self samples."""
+        own = Counter()
+        total = Counter()
+        for stack, count in self.labelled_stacks():
+            # stack[0] is the thread name, the last entry is the running function
+            own[stack[-1]] += count
+            for function in set(stack[1:]):
+                total[function] += count
+        return [(function, count, total[function]) for function, count in own.most_common(n)]
+
+
+class Histogram:
+    """Counts durations into HISTOGRAM_BUCKETS_MS."""
+
+    def __init__(self):
+        self.counts = [0] * len(HISTOGRAM_BUCKETS_MS)
+        self.values = []
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        self.values.append(ms)
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+
+    def lines(self):
+        if not self.values:
+            return ["  (no samples)"]
+        values = sorted(self.values)
+        lines = [
+            f"  n={len(values)} min={values[0]:.1f}ms "
+            f"p50={values[len(values) // 2]:.1f}ms "
+            f"p95={values[int(len(values) * 0.95)]:.1f}ms max={values[-1]:.1f}ms"
+        ]
+        widest = max(self.counts)
+        lower = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS_MS, self.counts):
+            label = f"{lower:g}-{bound:g}ms" if bound != float("inf") else f">{lower:g}ms"
+            bar = "#" * (40 * count // widest if widest else 0)
+            lines.append(f"  {label:>12} {count:6d} {bar}")
+            lower = bound
+        return lines
+
+
+class ProfileSession:
+    """Profiles a fixed number of rotations and reports on them."""
+
+    def __init__(self, rotations, name="profile", interval=0.01):
+        self.rotations = rotations
+        self.name = name
+        self.profiler = SamplingProfiler(interval)
+        self.frame_times = Histogram()
+        self.refresh_times = Histogram()
+        self.rotations_done = 0
+        self.started_at = None
+
+    def start(self):
+        print(f"Profiling the next {self.rotations} rotations")
+        self.started_at = time.perf_counter()
+        self.profiler.start()
+        return self
+
+    def record_rotation(self):
+        self.rotations_done += 1
+
+    def record_frame(self, seconds):
+        self.frame_times.record(seconds)
+
+    def record_refresh(self, seconds):
+        self.refresh_times.record(seconds)
+
+    @property
+    def done(self):
+        return self.rotations_done >= self.rotations
+
+    def finish(self, top_n=15):
+        """Stop sampling, write the collapsed stacks and print the report."""
+        self.profiler.stop()
+        elapsed = time.perf_counter() - self.started_at
+        folded_path = f"{self.name}.folded"
+        self.profiler.write_collapsed(folded_path)
+
+        lines = [
+            f"Profiled {self.rotations_done} rotations in {elapsed:.1f}s, {self.profiler.samples} samples",
+            "Frame times (compose + SetImage + swap per swapped frame, pacing sleeps left out):",
+            *self.frame_times.lines(),
+            "Refresh latency:",
+            *self.refresh_times.lines(),
+            "Idle samples, sleeping or waiting, left out of the stacks:",
+            *(f"  {count:6d}  {name}" for name, count in self.profiler.idle.most_common()),
+            f"Top {top_n} functions by samples (self / total):",
+        ]
+        for function, own, total in self.profiler.top(top_n):
+            lines.append(f"  {own:6d} {total:6d}  {function}")
+        lines.append(f"Collapsed stacks written to {folded_path}")
+
+        report = "\n".join(lines)
+        with open(f"{self.name}.txt", "w") as out:
+            out.write(report + "\n")
+        print(report)
+        return report
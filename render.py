@@ -0,0 +1,60 @@
+"""Off-screen rendering of matchup screens.
+
+Frames are composed into a PIL image the size of the panel and then pushed to
+the matrix canvas in one SetImage() call. Keeping a copy of the pixels on our
+side is what lets other parts of the program (the status server, for one)
+see exactly what the board is showing.
+"""
+from PIL import BdfFontFile, Image, ImageDraw
+
+PANEL_WIDTH = 64
+PANEL_HEIGHT = 32
+
+
+class BdfFont:
+    """A BDF font that draws into PIL images.
+
+    Mirrors the parts of rgbmatrix.graphics.Font that we use, so positions
+    are given the same way: x is the left edge and y is the baseline.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as fp:
+            bdf = BdfFontFile.BdfFontFile(fp)
+            # Pillow drops the header, read the bounding box the way the
+            # rgbmatrix library does to get the same height and baseline
+            fp.seek(0)
+            for line in fp:
+                if line.startswith(b"FONTBOUNDINGBOX"):
+                    _, _, height, _, y_offset = line.split()
+                    break
+            else:
+                raise IOError(f"No FONTBOUNDINGBOX in {path}")
+        self.path = path
+        self.height = int(height)
+        self.baseline = self.height + int(y_offset)
+        self.image_font = bdf.to_imagefont()
+
+    def CharacterWidth(self, char):
+        """Advance width of a unicode code point, -1 if the font lacks it."""
+        if not 0 <= char < 256:
+            return -1
+        return int(self.image_font.getlength(chr(char)))
+
+    def text_width(self, text):
+        return int(self.image_font.getlength(text))
+
+
+def load_font(path):
+    """Load a BDF font, raising IOError if the file can't be read."""
+    return BdfFont(path)
+
+
+def new_frame(bg_color=(0, 0, 0), width=PANEL_WIDTH, height=PANEL_HEIGHT):
+    return Image.new("RGB", (width, height), bg_color)
+
+
+def draw_text(frame, font, x, y, color, text):
+    """Draw text with its baseline at y, returning the advance in pixels."""
+    ImageDraw.Draw(frame).text((x, y - font.baseline), text, font=font.image_font, fill=color)
+    return font.text_width(text)
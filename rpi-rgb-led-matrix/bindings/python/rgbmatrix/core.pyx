@@ -1,16 +1,19 @@
 # distutils: language = c++
 
 from libcpp cimport bool
-from libc.stdint cimport uint8_t, uint32_t, uintptr_t
+from libc.stdint cimport uint8_t, uint32_t
 import cython
 
 cdef class Canvas:
     cdef cppinc.Canvas* _getCanvas(self) except *:
         raise Exception("Not implemented")
 
-    def SetImage(self, image, int offset_x = 0, int offset_y = 0, unsafe=True):
-        if (image.mode != "RGB"):
-            raise Exception("Currently, only RGB mode is supported for SetImage(). Please create images with mode 'RGB' or convert first with image = image.convert('RGB'). Pull requests to support more modes natively are also welcome :)")
+    def SetImage(self, image, int offset_x = 0, int offset_y = 0, unsafe=True, background=(0, 0, 0)):
+        # FrameCanvas can't be read back, so partially transparent pixels are
+        # blended against 'background'. Fully transparent pixels are skipped,
+        # leaving whatever is already on the canvas.
+        if image.mode not in ("RGB", "RGBA", "L", "P"):
+            raise Exception("Currently, only RGB, RGBA, L and P modes are supported for SetImage(). Please create images with one of those modes or convert first with image = image.convert('RGB'). Pull requests to support more modes natively are also welcome :)")
 
         if unsafe:
             #In unsafe mode we directly access the underlying PIL image array
@@ -18,16 +21,32 @@ cdef class Canvas:
             #however it's super fast and seems to work fine
             #https://groups.google.com/forum/#!topic/cython-users/Dc1ft5W6KM4
             img_width, img_height = image.size
-            self.SetPixelsPillow(offset_x, offset_y, img_width, img_height, image)
+            if image.mode == "RGB":
+                self.SetPixelsPillow(offset_x, offset_y, img_width, img_height, image)
+            elif image.mode == "RGBA":
+                self.SetPixelsPillowRGBA(offset_x, offset_y, img_width, img_height, image, background)
+            else:
+                self.SetPixelsPillowIndexed(offset_x, offset_y, img_width, img_height, image, background)
         else:
             # First implementation of a SetImage(). OPTIMIZE_ME: A more native
             # implementation that directly reads the buffer and calls the underlying
             # C functions can certainly be faster.
+            if image.mode != "RGB":
+                image = image.convert("RGBA")
             img_width, img_height = image.size
             pixels = image.load()
+            (br, bg, bb) = background
             for x in range(max(0, -offset_x), min(img_width, self.width - offset_x)):
                 for y in range(max(0, -offset_y), min(img_height, self.height - offset_y)):
-                    (r, g, b) = pixels[x, y]
+                    if image.mode == "RGB":
+                        (r, g, b) = pixels[x, y]
+                    else:
+                        (r, g, b, a) = pixels[x, y]
+                        if a == 0:
+                            continue
+                        r = (r * a + br * (255 - a)) // 255
+                        g = (g * a + bg * (255 - a)) // 255
+                        b = (b * a + bb * (255 - a)) // 255
                     self.SetPixel(x + offset_x, y + offset_y, r, g, b)
 
     @cython.boundscheck(False)
@@ -37,21 +56,94 @@ cdef class Canvas:
         cdef int frame_width = my_canvas.width()
         cdef int frame_height = my_canvas.height()
         cdef int row, col
-        cdef uint8_t r, g, b
-        cdef uint32_t **image_ptr
-        cdef uint32_t pixel
-        image.load()
-        ptr_tmp = dict(image.im.unsafe_ptrs)['image32']
-        image_ptr = (<uint32_t **>(<uintptr_t>ptr_tmp))
+        cdef Py_ssize_t i
+        # Packed rows of 3 bytes a pixel. Pillow 11 dropped unsafe_ptrs, and
+        # a frame this size copies in no time
+        cdef const uint8_t[:] pixels = image.tobytes()
 
         for col in range(max(0, -xstart), min(width, frame_width - xstart)):
             for row in range(max(0, -ystart), min(height, frame_height - ystart)):
-                pixel = image_ptr[row][col]
-                r = (pixel ) & 0xFF
-                g = (pixel >> 8) & 0xFF
-                b = (pixel >> 16) & 0xFF
+                i = (<Py_ssize_t>row * width + col) * 3
+                my_canvas.SetPixel(xstart+col, ystart+row, pixels[i], pixels[i + 1], pixels[i + 2])
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def SetPixelsPillowRGBA(self, int xstart, int ystart, int width, int height, image, background=(0, 0, 0)):
+        cdef cppinc.FrameCanvas* my_canvas = <cppinc.FrameCanvas*>self._getCanvas()
+        cdef int frame_width = my_canvas.width()
+        cdef int frame_height = my_canvas.height()
+        cdef int row, col
+        cdef uint32_t a, r, g, b
+        cdef uint32_t br = background[0], bg = background[1], bb = background[2]
+        cdef Py_ssize_t i
+        # Packed rows of 4 bytes a pixel, see SetPixelsPillow
+        cdef const uint8_t[:] pixels = image.tobytes()
+
+        for col in range(max(0, -xstart), min(width, frame_width - xstart)):
+            for row in range(max(0, -ystart), min(height, frame_height - ystart)):
+                i = (<Py_ssize_t>row * width + col) * 4
+                a = pixels[i + 3]
+                if a == 0:
+                    continue
+                r = pixels[i]
+                g = pixels[i + 1]
+                b = pixels[i + 2]
+                if a != 0xFF:
+                    r = (r * a + br * (255 - a)) // 255
+                    g = (g * a + bg * (255 - a)) // 255
+                    b = (b * a + bb * (255 - a)) // 255
                 my_canvas.SetPixel(xstart+col, ystart+row, r, g, b)
 
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def SetPixelsPillowIndexed(self, int xstart, int ystart, int width, int height, image, background=(0, 0, 0)):
+        """Draw an 8 bit 'L' or 'P' image through a 256 entry color table."""
+        cdef cppinc.FrameCanvas* my_canvas = <cppinc.FrameCanvas*>self._getCanvas()
+        cdef int frame_width = my_canvas.width()
+        cdef int frame_height = my_canvas.height()
+        cdef int row, col, i
+        cdef uint8_t index
+        cdef uint8_t lut[256][4]
+        cdef Py_ssize_t offset
+
+        # Resolve the palette and any transparency once, outside the loop
+        if image.mode == "P":
+            palette = image.getpalette("RGBA") or []
+            transparency = image.info.get("transparency")
+        else:
+            palette = []
+            transparency = None
+        for i in range(256):
+            if 4 * i + 3 < len(palette):
+                lut[i][0] = palette[4 * i]
+                lut[i][1] = palette[4 * i + 1]
+                lut[i][2] = palette[4 * i + 2]
+                lut[i][3] = palette[4 * i + 3]
+            else:
+                lut[i][0] = lut[i][1] = lut[i][2] = i
+                lut[i][3] = 0xFF
+        if isinstance(transparency, int):
+            lut[transparency][3] = 0
+        elif isinstance(transparency, bytes):
+            for i in range(min(256, len(transparency))):
+                lut[i][3] = transparency[i]
+        for i in range(256):
+            if lut[i][3] != 0 and lut[i][3] != 0xFF:
+                lut[i][0] = (lut[i][0] * lut[i][3] + background[0] * (255 - lut[i][3])) // 255
+                lut[i][1] = (lut[i][1] * lut[i][3] + background[1] * (255 - lut[i][3])) // 255
+                lut[i][2] = (lut[i][2] * lut[i][3] + background[2] * (255 - lut[i][3])) // 255
+
+        # Packed rows of one index a pixel, see SetPixelsPillow
+        cdef const uint8_t[:] pixels = image.tobytes()
+
+        for col in range(max(0, -xstart), min(width, frame_width - xstart)):
+            for row in range(max(0, -ystart), min(height, frame_height - ystart)):
+                offset = <Py_ssize_t>row * width + col
+                index = pixels[offset]
+                if lut[index][3] == 0:
+                    continue
+                my_canvas.SetPixel(xstart+col, ystart+row, lut[index][0], lut[index][1], lut[index][2])
+
 cdef class FrameCanvas(Canvas):
     def __dealloc__(self):
         if <void*>self.__canvas != NULL:
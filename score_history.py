@@ -0,0 +1,163 @@
+"""SQLite store of matchup scores over time.
+
+Every snapshot from get_team_data() is queued with record() and written by a
+background thread in batches, so the render loop never waits on the disk.
+The database runs in WAL mode so queries (sparklines, recent swings) can read
+while the writer is appending.
+
+Storage stays bounded: samples older than a day are thinned out to one per
+matchup every COMPACT_BUCKET seconds, and anything past the retention window
+is dropped.
+"""
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    ts REAL NOT NULL,
+    league TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    matchup INTEGER NOT NULL,
+    team1 INTEGER,
+    points1 REAL NOT NULL,
+    team2 INTEGER,
+    points2 REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scores_league_week_matchup
+    ON scores (league, week, matchup, ts);
+CREATE INDEX IF NOT EXISTS idx_scores_ts ON scores (ts);
+"""
+
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 2.0  # seconds
+COMPACT_INTERVAL = 60 * 60  # seconds between maintenance passes
+COMPACT_AFTER = 24 * 60 * 60  # samples older than this get thinned out
+COMPACT_BUCKET = 15 * 60  # keep one sample per matchup per bucket
+RETENTION = 180 * 24 * 60 * 60  # a full season plus the playoffs
+
+_STOP = object()
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ScoreHistory:
+    """Persists matchup scores and answers queries about them."""
+
+    def __init__(self, path="history.db", retention=RETENTION):
+        self.path = path
+        self.retention = retention
+        with _connect(path) as conn:
+            conn.executescript(SCHEMA)
+        conn.close()
+
+        self._queue = queue.Queue()
+        self._last_compact = 0
+        self._writer = threading.Thread(target=self._run, name="score-history", daemon=True)
+        self._writer.start()
+
+    def record(self, league, week, matchups, ts=None):
+        """Queue one snapshot for writing. Never blocks."""
+        ts = time.time() if ts is None else ts
+        for matchup in matchups:
+            team1, team2 = matchup["team1"], matchup["team2"]
+            self._queue.put((
+                ts, str(league), week, matchup["matchup_id"],
+                team1.get("roster_id"), team1["points"],
+                team2.get("roster_id"), team2["points"],
+            ))
+
+    def close(self):
+        """Flush everything queued so far and stop the writer."""
+        self._queue.put(_STOP)
+        self._writer.join()
+
+    def _run(self):
+        conn = _connect(self.path)
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self._queue.get(timeout=FLUSH_INTERVAL)]
+            except queue.Empty:
+                batch = []
+
+            # Drain whatever else is waiting so it lands in one transaction
+            while batch and len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                batch.remove(_STOP)
+                stopping = True
+
+            try:
+                if batch:
+                    with conn:
+                        conn.executemany("INSERT INTO scores VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                if time.time() - self._last_compact >= COMPACT_INTERVAL:
+                    self._compact(conn)
+            except sqlite3.Error as e:
+                print(f"Failed to write score history: {e}")
+        conn.close()
+
+    def _compact(self, conn, now=None):
+        now = time.time() if now is None else now
+        self._last_compact = now
+        with conn:
+            conn.execute("DELETE FROM scores WHERE ts < ?", (now - self.retention,))
+            conn.execute(
+                """
+                DELETE FROM scores WHERE ts < :cutoff AND rowid NOT IN (
+                    SELECT MAX(rowid) FROM scores WHERE ts < :cutoff
+                    GROUP BY league, week, matchup, CAST(ts / :bucket AS INTEGER)
+                )
+                """,
+                {"cutoff": now - COMPACT_AFTER, "bucket": COMPACT_BUCKET},
+            )
+        # Hand the freed pages back and keep the WAL file from growing
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    # Queries run on the caller's thread with their own connection; WAL lets
+    # them read while the writer is busy.
+
+    def _query(self, sql, params):
+        conn = _connect(self.path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def sparkline(self, league, week, matchup_id, since=None):
+        """Return [(ts, points1, points2), ...] for one matchup, oldest first."""
+        return self._query(
+            """
+            SELECT ts, points1, points2 FROM scores
+            WHERE league = ? AND week = ? AND matchup = ? AND ts >= ?
+            ORDER BY ts
+            """,
+            (str(league), week, matchup_id, since or 0),
+        )
+
+    def biggest_swing(self, league, week, window=5 * 60, now=None):
+        """Return (matchup_id, swing) for the matchup whose margin moved most
+        within the last `window` seconds, or None if nothing was recorded."""
+        now = time.time() if now is None else now
+        rows = self._query(
+            """
+            SELECT matchup, MAX(points1 - points2) - MIN(points1 - points2) AS swing
+            FROM scores
+            WHERE league = ? AND week = ? AND ts >= ?
+            GROUP BY matchup
+            ORDER BY swing DESC
+            LIMIT 1
+            """,
+            (str(league), week, now - window),
+        )
+        return rows[0] if rows else None
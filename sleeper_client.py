@@ -0,0 +1,34 @@
+"""sleeper_wrapper's League, pointed at a configurable API with timeouts.
+
+The stock League hardcodes api.sleeper.app, calls requests.get() with no
+timeout and returns HTTP errors instead of raising them. This subclass fixes
+all three, which lets the board run against the mock server in soak.py and
+lets the fetcher see failures as failures. The league itself is fetched the
+first time it's needed, not on construction, so a board can start while
+Sleeper is failing and leave the retrying to the fetcher.
+"""
+import requests
+from sleeper_wrapper import League as SleeperLeague
+
+SLEEPER_API_URL = "https://api.sleeper.app/v1"
+REQUEST_TIMEOUT = 10  # seconds
+
+
+class League(SleeperLeague):
+    def __init__(self, league_id, base_url=SLEEPER_API_URL, timeout=REQUEST_TIMEOUT):
+        self.league_id = league_id
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._base_url = f"{base_url.rstrip('/')}/league/{league_id}"
+        self._league_data = None
+
+    @property
+    def _league(self):
+        if self._league_data is None:
+            self._league_data = self._call(self._base_url)
+        return self._league_data
+
+    def _call(self, url):
+        response = self._session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
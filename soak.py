@@ -0,0 +1,197 @@
+"""Soak and load harness: runs boards for hours against the mock Sleeper API.
+
+Starts mock_sleeper.MockSleeper and one headless main.py process per board.
+The boards run on an accelerated clock (--speed applies to both the boards'
+intervals and the mock's scores). Every few seconds it samples each board's
+RSS, open file descriptors and CPU time from /proc, and its rotation and
+refresh counters from /stats.json. At the end it checks them against the
+bounds given on the command line and exits non-zero if any were broken.
+With --hub, the first board fetches for all of them (main.py --serve-hub).
+
+    python soak.py --duration 7200 --boards 4 --leagues 4 --teams 32 --speed 30
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from mock_sleeper import MockSleeper
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Board:
+    """One headless main.py process and the samples taken from it."""
+
+    def __init__(self, name, league_id, api_url, speed, transition, mode, work_dir, extra_args=()):
+        self.name = name
+        self.port = free_port()
+        self.work_dir = os.path.join(work_dir, name)
+
+        # main.py reads fonts and the default logo relative to its cwd
+        os.makedirs(os.path.join(self.work_dir, "logos"))
+        shutil.copy(os.path.join(ROOT, "logos", "default.jpg"), os.path.join(self.work_dir, "logos"))
+        os.makedirs(os.path.join(self.work_dir, "rpi-rgb-led-matrix"))
+        os.symlink(os.path.join(ROOT, "rpi-rgb-led-matrix", "fonts"),
+                   os.path.join(self.work_dir, "rpi-rgb-led-matrix", "fonts"))
+
+        self.log = open(os.path.join(self.work_dir, "board.log"), "w")
+        self.process = subprocess.Popen(
+            [
+                sys.executable, os.path.join(ROOT, "main.py"), "--headless",
+                "--league", league_id, "--sleeper-url", api_url, "--speed", str(speed),
+                "--transition", transition, "--mode", mode, "--status-port", str(self.port), *extra_args,
+            ],
+            cwd=self.work_dir, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+        self.samples = []
+        self.refresh_times = {}  # refresh count -> seconds
+
+    def sample(self):
+        pid = self.process.pid
+        with open(f"/proc/{pid}/status") as status:
+            rss_kb = next(int(line.split()[1]) for line in status if line.startswith("VmRSS:"))
+        fds = len(os.listdir(f"/proc/{pid}/fd"))
+        with open(f"/proc/{pid}/stat") as stat:
+            # Fields after the command name, utime and stime are 14 and 15
+            fields = stat.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/stats.json", timeout=5) as response:
+                stats = json.load(response)
+        except Exception:
+            stats = {}
+        if stats.get("last_refresh_seconds") is not None:
+            self.refresh_times[stats["refreshes"]] = stats["last_refresh_seconds"]
+
+        self.samples.append({
+            "time": time.time(),
+            "rss_mb": rss_kb / 1024,
+            "fds": fds,
+            "cpu": cpu,
+            "rotations": stats.get("rotations", 0),
+        })
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def stop(self):
+        if self.alive():
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.log.close()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def check(board, args):
+    """Return a list of (metric, value, limit, ok) for one board."""
+    # Measure growth from the end of the warm up, when caches are full
+    warm = [s for s in board.samples if s["time"] - board.samples[0]["time"] >= args.warmup]
+    if len(warm) < 2:
+        return [("samples after warm up", len(warm), 2, False)]
+    first, last = warm[0], warm[-1]
+    rotations = last["rotations"] - first["rotations"]
+    cpu_per_rotation = (last["cpu"] - first["cpu"]) / rotations * 1000 if rotations else float("inf")
+    refresh_p95 = percentile(list(board.refresh_times.values()), 0.95)
+    return [
+        ("rss growth (MB)", round(last["rss_mb"] - first["rss_mb"], 1), args.max_rss_growth, last["rss_mb"] - first["rss_mb"] <= args.max_rss_growth),
+        ("peak rss (MB)", round(max(s["rss_mb"] for s in warm), 1), args.max_rss, max(s["rss_mb"] for s in warm) <= args.max_rss),
+        ("fd growth", last["fds"] - first["fds"], args.max_fd_growth, last["fds"] - first["fds"] <= args.max_fd_growth),
+        ("cpu per rotation (ms)", round(cpu_per_rotation, 1), args.max_cpu_per_rotation, cpu_per_rotation <= args.max_cpu_per_rotation),
+        ("refresh p95 (s)", round(refresh_p95, 2), args.max_refresh, refresh_p95 <= args.max_refresh),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test boards against a mock Sleeper API.")
+    parser.add_argument('--duration', type=float, default=600, help="Seconds of real time to run for.")
+    parser.add_argument('--boards', type=int, default=2)
+    parser.add_argument('--leagues', type=int, default=2)
+    parser.add_argument('--teams', type=int, default=32)
+    parser.add_argument('--speed', type=float, default=30, help="Clock acceleration for boards and scores.")
+    parser.add_argument('--transition', default='slide')
+    parser.add_argument('--mode', choices=('active', 'idle'), default='active',
+                        help="Mode the boards are pinned to, so runs don't depend on the day of the week.")
+    parser.add_argument('--latency', type=float, default=0.02, help="Base seconds added to every request.")
+    parser.add_argument('--spike-rate', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--churn', type=float, default=2.0, help="Avatar changes per user per game hour.")
+    parser.add_argument('--sample-interval', type=float, default=5)
+    parser.add_argument('--warmup', type=float, default=60, help="Seconds before growth is measured.")
+    parser.add_argument('--max-rss-growth', type=float, default=8.0)
+    parser.add_argument('--max-rss', type=float, default=200.0)
+    parser.add_argument('--max-fd-growth', type=int, default=4)
+    parser.add_argument('--max-cpu-per-rotation', type=float, default=250.0)
+    parser.add_argument('--max-refresh', type=float, default=10.0)
+    parser.add_argument('--hub', action='store_true', help="Have board0 fetch and serve the other boards.")
+    parser.add_argument('--keep', action='store_true', help="Keep board working directories and logs.")
+    args = parser.parse_args()
+
+    mock = MockSleeper(leagues=args.leagues, teams=args.teams, speed=args.speed, latency=args.latency,
+                       spike_rate=args.spike_rate, error_rate=args.error_rate,
+                       churn_per_hour=args.churn).start()
+    print(f"Mock Sleeper API at {mock.url}")
+
+    work_dir = tempfile.mkdtemp(prefix="soak-")
+    hub_port = free_port()
+    boards = []
+    for i in range(args.boards):
+        extra_args = []
+        if args.hub:
+            extra_args = ["--serve-hub", str(hub_port)] if i == 0 else ["--hub", f"127.0.0.1:{hub_port}"]
+        boards.append(Board(f"board{i}", mock.league_ids[i % len(mock.league_ids)], mock.url, args.speed,
+                            args.transition, args.mode, work_dir, extra_args))
+    failed = False
+    try:
+        end = time.time() + args.duration
+        while time.time() < end:
+            time.sleep(args.sample_interval)
+            for board in boards:
+                if not board.alive():
+                    print(f"{board.name} exited with {board.process.returncode}, see {board.log.name}")
+                    args.keep = True
+                    return 1
+                board.sample()
+            latest = boards[0].samples[-1]
+            print(f"{int(end - time.time())}s left: board0 rss={latest['rss_mb']:.1f}MB fds={latest['fds']} "
+                  f"rotations={latest['rotations']} mock requests={mock.requests} errors={mock.errors}")
+
+        for board in boards:
+            print(f"{board.name}:")
+            for metric, value, limit, ok in check(board, args):
+                print(f"  {'ok  ' if ok else 'FAIL'} {metric}: {value} (limit {limit})")
+                failed = failed or not ok
+        return 1 if failed else 0
+    finally:
+        for board in boards:
+            board.stop()
+        mock.stop()
+        if args.keep:
+            print(f"Board logs kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
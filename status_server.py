@@ -0,0 +1,112 @@
+"""Tiny HTTP server that shows what the board is displaying.
+
+GET /snapshot.json  - the matchup data the board is rotating through
+GET /frame.png      - the frame currently on the panel
+GET /stats.json     - counters from the render loop and data layer
+
+Payloads are encoded once, when the render loop publishes a change, and
+served from cached bytes with an ETag. Polling clients never touch the render
+loop; a client that already has the latest version gets a 304.
+"""
+import hashlib
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Payload:
+    """Immutable encoded response body."""
+
+    __slots__ = ("body", "etag", "content_type")
+
+    def __init__(self, body, content_type):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.content_type = content_type
+
+
+class StatusServer:
+    """Serves the latest snapshot and frame from a background thread."""
+
+    def __init__(self, host="0.0.0.0", port=8080):
+        self._snapshot = None
+        self._frame = None
+        self._frame_key = None
+        self._stats = None
+
+        status = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/snapshot.json":
+                    payload = status._snapshot
+                elif path == "/frame.png":
+                    payload = status._frame
+                elif path == "/stats.json":
+                    payload = status._stats
+                else:
+                    self.send_error(404)
+                    return
+                if payload is None:
+                    self.send_error(503, "Nothing published yet")
+                    return
+
+                if self.headers.get("If-None-Match") == payload.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", payload.etag)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", payload.content_type)
+                self.send_header("Content-Length", str(len(payload.body)))
+                self.send_header("ETag", payload.etag)
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                self.wfile.write(payload.body)
+
+            def log_message(self, format, *args):
+                # Dashboards poll constantly, don't flood the console
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="status-server", daemon=True)
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self._thread.start()
+        print(f"Status server listening on port {self.port}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    # Payloads are swapped in with a single attribute assignment, so the
+    # handler threads always see either the old or the new version whole.
+
+    def publish_snapshot(self, matchups, **extra):
+        """Encode the matchup list as JSON if it differs from the last one."""
+        body = json.dumps({"matchups": matchups, **extra}, sort_keys=True).encode("utf-8")
+        if self._snapshot is None or self._snapshot.body != body:
+            self._snapshot = _Payload(body, "application/json")
+
+    def publish_stats(self, stats):
+        """Encode a dict of counters as JSON."""
+        self._stats = _Payload(json.dumps(stats, sort_keys=True).encode("utf-8"), "application/json")
+
+    def publish_frame(self, frame):
+        """Encode a PIL frame as PNG if its pixels changed."""
+        key = frame.tobytes()
+        if key == self._frame_key:
+            return
+        buffer = io.BytesIO()
+        frame.save(buffer, format="PNG")
+        self._frame_key = key
+        self._frame = _Payload(buffer.getvalue(), "image/png")
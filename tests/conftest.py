@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# The board's modules are flat scripts at the top of the repo
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mock_sleeper import MockSleeper  # noqa: E402
+
+
+@pytest.fixture
+def mock_sleeper():
+    """A local mock Sleeper API, stopped after the test."""
+    mock = MockSleeper().start()
+    try:
+        yield mock
+    finally:
+        mock.stop()
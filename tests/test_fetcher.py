@@ -0,0 +1,59 @@
+import time
+
+import requests
+
+from fetcher import CLOSED, OPEN, CircuitBreaker, RetryBudget, SnapshotFetcher
+
+
+def test_fetcher_breaker_and_budget(mock_sleeper):
+    """SnapshotFetcher against the mock with failures injected.
+
+    Covers coalescing, the breaker opening, its half-open trial, and the
+    retry budget running dry.
+    """
+    url = f"{mock_sleeper.url}/league/{mock_sleeper.league_ids[0]}/matchups/1"
+
+    def fetch():
+        response = requests.get(url, timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    # Refreshes asked for while one is in flight join it
+    mock_sleeper.latency = 0.5
+    fetcher = SnapshotFetcher(fetch)
+    for thread in [fetcher.revalidate() for _ in range(5)]:
+        thread.join()
+    assert fetcher.stats["requests"] == 1
+    assert fetcher.stats["coalesced"] == 4
+    assert fetcher.snapshot is not None and fetcher.updated.is_set()
+    mock_sleeper.latency = 0
+
+    # Failures in a row open the breaker, further refreshes are rejected
+    mock_sleeper.error_rate = 1.0
+    fetcher = SnapshotFetcher(fetch, max_retries=2, breaker=CircuitBreaker(3, reset_timeout=0.5))
+    fetcher.revalidate().join()
+    assert fetcher.breaker.state == OPEN
+    assert fetcher.stats["failures"] == 3 and fetcher.stats["retries"] == 2
+    fetcher.revalidate().join()
+    assert fetcher.stats["rejected"] == 1 and fetcher.stats["requests"] == 3
+
+    # After the reset timeout one trial goes through; failing reopens
+    time.sleep(0.6)
+    fetcher.max_retries = 0
+    fetcher.revalidate().join()
+    assert fetcher.stats["requests"] == 4
+    assert fetcher.breaker.state == OPEN
+
+    # and a trial that succeeds closes it again
+    time.sleep(0.6)
+    mock_sleeper.error_rate = 0.0
+    fetcher.revalidate().join()
+    assert fetcher.breaker.state == CLOSED
+    assert fetcher.snapshot is not None
+
+    # With the retry budget spent, a failure isn't retried
+    mock_sleeper.error_rate = 1.0
+    fetcher = SnapshotFetcher(fetch, max_retries=3, budget=RetryBudget(ratio=0.1, initial=1))
+    fetcher.revalidate().join()
+    assert fetcher.stats["retries"] == 1 and fetcher.stats["failures"] == 2
+    assert fetcher.snapshot is None and fetcher.last_error is not None
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tracemalloc
+
+from PIL import Image
+
+import animation
+from conftest import ROOT
+from image_cache import ImageCache, image_bytes
+
+ITERATIONS = 2000
+
+
+def test_image_cache_memory_flat(tmp_path):
+    """Hammer the cache the way the board does and check memory stays flat.
+
+    Rotates through every logo, plus an animated GIF made from each one,
+    through get_animation() as draw_matchup does. One file is rewritten
+    every few rotations like get_team_data() does, and tracemalloc
+    snapshots taken after a warm up and at the end are compared.
+    """
+    logo_dir = os.path.join(ROOT, "logos")
+    paths = []
+    for name in sorted(os.listdir(logo_dir)):
+        path = shutil.copy(os.path.join(logo_dir, name), tmp_path)
+        paths.append(path)
+        # An animated copy, the way some Sleeper avatars are
+        with Image.open(path) as source:
+            frame = source.convert("RGBA").resize((64, 64))
+        frames = [frame.rotate(angle) for angle in range(0, 360, 60)]
+        gif_path = os.path.join(tmp_path, os.path.splitext(name)[0] + ".gif")
+        frames[0].save(gif_path, save_all=True, append_images=frames[1:], duration=80, loop=0)
+        paths.append(gif_path)
+
+    # Enough for every logo's frames at 20x20, but not the 32x32 copies
+    budget = 0
+    for path in paths:
+        with Image.open(path) as source:
+            budget += image_bytes(animation.decode(source, (20, 20)))
+    cache = ImageCache(max_bytes=budget)
+
+    tracemalloc.start()
+    try:
+        baseline = None
+        for i in range(ITERATIONS):
+            path = paths[i % len(paths)]
+            if i % 7 == 0:
+                # Touch the file so it looks freshly downloaded
+                os.utime(path, ns=(i, i))
+            cache.get_animation(path, (20, 20))
+            if i % 50 == 0:
+                # Bigger copies that don't fit the budget force evictions
+                cache.get_animation(path, (32, 32))
+                cache.get(path, (32, 32))
+            if i == ITERATIONS // 10:
+                baseline = tracemalloc.take_snapshot()
+        growth = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, "filename"))
+    finally:
+        tracemalloc.stop()
+
+    assert cache.evictions > 0
+    assert cache.bytes <= cache.max_bytes
+    assert growth < 64 * 1024, f"image cache memory grew {growth} bytes after warm up"
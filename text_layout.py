@@ -0,0 +1,111 @@
+"""Fitting text into boxes on the panel.
+
+Everything here works from a font's CharacterWidth(), so it takes either an
+rgbmatrix.graphics.Font or a render.BdfFont. Characters the font has no
+glyph for (emoji, most non-Latin scripts) are replaced by their unaccented
+letter where there is one and dropped otherwise. Strings that don't fit are
+abbreviated, then truncated. Widths and layouts are memoized per (font, text,
+box) in bounded LRU caches, so after warm() runs at snapshot load, laying out
+a frame costs a few dictionary lookups.
+"""
+import re
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+Box = namedtuple("Box", "x y width height")
+Layout = namedtuple("Layout", "text x y width")
+
+CACHE_SIZE = 4096
+
+_VOWELS = re.compile(r"(?<=\w)[aeiouAEIOU]")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def text_width(font, text):
+    """Width of text in pixels; characters the font lacks count as zero."""
+    return sum(max(0, font.CharacterWidth(ord(char))) for char in text)
+
+
+def _drawable_char(font, char):
+    if font.CharacterWidth(ord(char)) >= 0:
+        return char
+    # e.g. "Ł" has no decomposition and goes, "Ĺ" becomes "L"
+    base = unicodedata.normalize("NFKD", char)[:1]
+    if base and base != char and font.CharacterWidth(ord(base)) >= 0:
+        return base
+    return ""
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def drawable(font, text):
+    """text with only characters font can draw."""
+    return "".join(_drawable_char(font, char) for char in text)
+
+
+def _candidates(text):
+    """Ever shorter versions of text, best first."""
+    text = " ".join(text.split())
+    yield text
+    words = text.split(" ")
+    if len(words) > 1 and words[0].lower() == "the":
+        words = words[1:]
+        yield " ".join(words)
+    # Drop vowels that aren't the first letter of a word
+    yield " ".join(_VOWELS.sub("", word) for word in words)
+    if len(words) > 1:
+        yield "".join(_VOWELS.sub("", word) for word in words)
+        # The first word tends to be the recognisable one
+        yield words[0]
+        yield _VOWELS.sub("", words[0])
+        yield "".join(word[0].upper() for word in words if word)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def fit(font, text, width):
+    """Return text, abbreviated or truncated until it fits in width pixels."""
+    # Measure only what can be drawn, a missing glyph would otherwise count
+    # as zero pixels and then fail to render
+    text = drawable(font, text)
+    shortest = text
+    for candidate in _candidates(text):
+        if text_width(font, candidate) <= width:
+            return candidate
+        shortest = candidate
+    while shortest and text_width(font, shortest) > width:
+        shortest = shortest[:-1]
+    return shortest
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def layout(font, text, box, align="center"):
+    """Fit text into box and work out where to draw it.
+
+    Returns a Layout whose x and y can go straight to DrawText (y is the
+    baseline), with the text vertically centered in the box.
+    """
+    fitted = fit(font, text, box.width)
+    width = text_width(font, fitted)
+    if align == "left":
+        x = box.x
+    elif align == "right":
+        x = box.x + box.width - width
+    else:
+        x = box.x + (box.width - width) // 2
+    y = box.y + (box.height - font.height) // 2 + font.baseline
+    return Layout(fitted, x, y, width)
+
+
+def warm(font, texts, box, align="center"):
+    """Lay out texts ahead of time, e.g. every team name in a new snapshot."""
+    for text in texts:
+        layout(font, text, box, align)
+
+
+def cache_info():
+    return {
+        "text_width": text_width.cache_info()._asdict(),
+        "drawable": drawable.cache_info()._asdict(),
+        "fit": fit.cache_info()._asdict(),
+        "layout": layout.cache_info()._asdict(),
+    }
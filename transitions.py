@@ -0,0 +1,131 @@
+"""Transitions between two composed frames.
+
+All frames of a transition are computed up front as NumPy operations over
+the outgoing and incoming frame buffers, so playing one back is nothing but
+SetImage() and SwapOnVSync() calls. Playback is paced with SwapOnVSync's
+framerate_fraction, and the time between swaps is recorded so dropped frames
+show up in the stats. The time each frame took to put up, without the wait
+for its slot, can be reported too.
+"""
+import time
+
+import numpy as np
+from PIL import Image
+
+TRANSITIONS = ("cut", "slide", "wipe", "crossfade")
+DURATION = 0.5  # seconds
+TARGET_FPS = 30
+
+
+def crossfade_frames(old, new, steps):
+    """Blend from old to new, shape (steps, height, width, 3)."""
+    weights = np.linspace(0, 256, steps + 1, dtype=np.uint16)[1:, None, None, None]
+    blended = old.astype(np.uint16) * (256 - weights) + new.astype(np.uint16) * weights
+    return (blended >> 8).astype(np.uint8)
+
+
+def slide_frames(old, new, steps):
+    """Push old out to the left with new coming in from the right."""
+    width = old.shape[1]
+    strip = np.concatenate([old, new], axis=1)
+    offsets = np.linspace(0, width, steps + 1).round().astype(np.intp)[1:]
+    columns = offsets[:, None] + np.arange(width)[None, :]
+    # strip[:, columns] is (height, steps, width, 3)
+    return strip[:, columns].transpose(1, 0, 2, 3)
+
+
+def wipe_frames(old, new, steps):
+    """Reveal new over old with an edge moving left to right."""
+    width = old.shape[1]
+    edges = np.linspace(0, width, steps + 1).round().astype(np.intp)[1:]
+    mask = np.arange(width)[None, :] < edges[:, None]
+    return np.where(mask[:, None, :, None], new[None], old[None])
+
+
+FRAME_BUILDERS = {
+    "slide": slide_frames,
+    "wipe": wipe_frames,
+    "crossfade": crossfade_frames,
+}
+
+
+def build_transition(name, old_frame, new_frame, duration=DURATION, fps=TARGET_FPS):
+    """Return the PIL frames for a transition, ending on new_frame."""
+    if name == "cut" or old_frame is None:
+        return [new_frame]
+    steps = max(1, int(round(duration * fps)))
+    frames = FRAME_BUILDERS[name](np.asarray(old_frame), np.asarray(new_frame), steps)
+    return [Image.fromarray(np.ascontiguousarray(frame)) for frame in frames]
+
+
+class PacingStats:
+    """Keeps track of how evenly transition frames were swapped."""
+
+    def __init__(self, fps=TARGET_FPS):
+        self.target_interval = 1.0 / fps
+        self.frames = 0
+        self.dropped = 0
+        self.max_interval = 0.0
+        self.total_time = 0.0
+
+    def record(self, interval):
+        self.frames += 1
+        self.total_time += interval
+        self.max_interval = max(self.max_interval, interval)
+        # Anything later than half a frame past its slot counts as dropped
+        if interval > self.target_interval * 1.5:
+            self.dropped += 1
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "fps": round(self.frames / self.total_time, 1) if self.total_time else 0.0,
+            "max_interval_ms": round(self.max_interval * 1000, 1),
+        }
+
+
+def framerate_fraction(refresh_rate_hz, fps=TARGET_FPS):
+    """The SwapOnVSync framerate_fraction closest to the target fps."""
+    if not refresh_rate_hz:
+        return 1
+    return max(1, min(255, int(round(refresh_rate_hz / fps))))
+
+
+def _wait_for_slot(seconds):
+    # A function of its own so the profiler can tell pacing from work
+    time.sleep(seconds)
+
+
+def play(matrix, canvas, frames, fraction=1, pacing=None, fps=TARGET_FPS, before_swap=None, after_swap=None,
+         work=None, started=None):
+    """Swap through frames at a steady rate and return the new back buffer.
+
+    SwapOnVSync does the pacing on the panel; on the emulator, which has no
+    vsync, we sleep out the rest of each frame slot instead. after_swap is
+    called with each frame once it is on the panel. work is called with the
+    seconds each frame took up to then, leaving out the sleep; the first
+    frame counts from started, e.g. when its screen began to be drawn.
+    """
+    interval = 1.0 / fps
+    last_swap = time.perf_counter()
+    work_start = last_swap if started is None else started
+    for frame in frames:
+        if before_swap is not None:
+            before_swap(canvas)
+        canvas.SetImage(frame)
+        canvas = matrix.SwapOnVSync(canvas, framerate_fraction=fraction)
+        if after_swap is not None:
+            after_swap(frame)
+        swapped = time.perf_counter()
+        if work is not None:
+            work(swapped - work_start)
+
+        remaining = interval - (swapped - last_swap)
+        if remaining > 0:
+            _wait_for_slot(remaining)
+        now = time.perf_counter()
+        if pacing is not None:
+            pacing.record(now - last_swap)
+        last_swap = work_start = now
+    return canvas